@@ -34,6 +34,7 @@ class Serial:
     def open(self) -> None: ...
     def close(self) -> None: ...
     def read(self, size: int = 1) -> bytes: ...
+    def readinto(self, b: typing.Union[bytearray, memoryview]) -> int: ...
     def read_until(
         self, expected: bytes = b"\n", size: typing.Optional[int] = None
     ) -> bytes: ...
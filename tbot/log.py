@@ -14,6 +14,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import codecs
 import enum
 import io
 import itertools
@@ -85,6 +86,112 @@ START_TIME = time.monotonic()
 _SPLIT_PATTERN = re.compile("(\r|\n)")
 
 
+class OutputNormalizer:
+    r"""
+    Incremental normalizer for terminal output.
+
+    Data is fed in chunks as it arrives.  The normalizer takes care of
+
+    - decoding UTF-8, even if a character is split across two chunks,
+    - folding ``"\r\n"`` and ``"\n\r"`` into ``"\n"``, even if the pair is
+      split across two chunks,
+    - removing the control sequences listed in ``strip``.
+
+    Data which might be the start of such a sequence is held back until the
+    next chunk arrives or the normalizer is flushed with ``final=True``.
+
+    :param bool newlines: Whether to fold newlines.
+    :param strip: Control sequences which should be removed from the output.
+    """
+
+    __slots__ = (
+        "newlines",
+        "strip",
+        "_strip_len",
+        "_decoder",
+        "_pending",
+        "_after_newline",
+    )
+
+    def __init__(self, newlines: bool = True, strip: typing.Iterable[str] = ()) -> None:
+        self.newlines = newlines
+        self.strip = tuple(strip)
+        self._strip_len = max(map(len, self.strip), default=0)
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._pending = ""
+        self._after_newline = False
+
+    def copy(self) -> "OutputNormalizer":
+        """Return an independent copy of this normalizer, including its state."""
+        new = OutputNormalizer(self.newlines, self.strip)
+        new._decoder.setstate(self._decoder.getstate())
+        new._pending = self._pending
+        new._after_newline = self._after_newline
+        return new
+
+    @property
+    def pending(self) -> str:
+        """Text which was held back and not yet returned."""
+        return self._pending
+
+    def decode(
+        self, data: typing.Union[bytes, bytearray, memoryview], final: bool = False
+    ) -> str:
+        """
+        Decode and normalize a chunk of bytes.
+
+        :param data: The next chunk of data.
+        :param bool final: Whether this is the last chunk.  If set, no data is
+            held back.
+        """
+        return self.normalize(self._decoder.decode(data, final), final)
+
+    def normalize(self, text: str, final: bool = False) -> str:
+        """
+        Normalize a chunk of text.
+
+        :param str text: The next chunk of text.
+        :param bool final: Whether this is the last chunk.  If set, no data is
+            held back.
+        """
+        if self._pending != "":
+            text = self._pending + text
+            self._pending = ""
+
+        if not final and self.strip != ():
+            # Hold back the start of a control sequence
+            index = text.rfind("\x1B", max(0, len(text) - self._strip_len + 1))
+            if index != -1:
+                tail = text[index:]
+                if any(seq.startswith(tail) for seq in self.strip):
+                    self._pending = tail
+                    text = text[:index]
+
+        if "\x1B" in text:
+            for seq in self.strip:
+                text = text.replace(seq, "")
+
+        if not self.newlines or text == "":
+            return text
+
+        if not final and text[-1] == "\r":
+            # Might be the first half of a "\r\n" pair
+            self._pending = "\r" + self._pending
+            text = text[:-1]
+
+        if self._after_newline and text[:1] == "\r":
+            # Second half of a "\n\r" pair
+            text = text[1:]
+            self._after_newline = False
+
+        if text != "":
+            # A newline which is not already part of a pair might be followed
+            # by a "\r" in the next chunk.
+            self._after_newline = text[-1] == "\n"
+
+        return text.replace("\r\n", "\n").replace("\n\r", "\n")
+
+
 class EventIO(io.StringIO):
     """Stream for a log event."""
 
@@ -111,10 +218,20 @@ class EventIO(io.StringIO):
 
         self.cursor = 0
         self.prefix: typing.Optional[str] = None
+        self.retain = True
+        """
+        Whether text written to this event is kept.  If ``False``, text is
+        dropped once it was printed and :py:meth:`getvalue` only returns text
+        which was not yet printed.  Use this for events which receive huge
+        amounts of output.
+        """
         self.verbosity = verbosity
         self.ty = ty
         self.data = kwargs
         self._nextline = True
+        self._normalizer = OutputNormalizer(
+            strip=("\x1B[H", "\x1B[2J", "\x1B[r", "\x1B[u")
+        )
 
         msg = str(message).split("\n", 1)
         if self.verbosity <= VERBOSITY:
@@ -134,11 +251,14 @@ class EventIO(io.StringIO):
         )
 
     def _print_stdout(self, last: bool = False) -> None:
-        buf = self.getvalue()[self.cursor :]
-
         if self.verbosity > VERBOSITY:
             return
 
+        # Only fetch the text which was not yet printed.  getvalue() would
+        # copy the whole event each time.
+        self.seek(self.cursor)
+        buf = self.read()
+
         for fragment in (f for f in _SPLIT_PATTERN.split(buf) if f != ""):
             if self._nextline:
                 sys.stdout.write(self._prefix() + c(""))
@@ -168,21 +288,22 @@ class EventIO(io.StringIO):
         written.
         """
 
-        s = (
-            s.replace("\x1B[H", "")
-            .replace("\x1B[2J", "")
-            .replace("\x1B[r", "")
-            .replace("\x1B[u", "")
-            .replace("\r\n", "\n")
-            .replace("\n\r", "\n")
-        )
-
-        res = super().write(s)
+        res = super().write(self._normalizer.normalize(s))
 
         self._print_stdout()
 
+        if not self.retain:
+            self.seek(0)
+            self.truncate()
+            self.cursor = 0
+
         return res
 
+    def getvalue(self) -> str:
+        """Return all text written to this log event."""
+        # Include text which is held back by the normalizer
+        return super().getvalue() + self._normalizer.pending
+
     def __enter__(self) -> "EventIO":
         return self
 
@@ -193,6 +314,7 @@ class EventIO(io.StringIO):
         No more text can be added to this log event after
         closing it.
         """
+        super().write(self._normalizer.normalize("", final=True))
         self._print_stdout(last=True)
 
         if LOGFILE is not None:
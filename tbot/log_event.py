@@ -20,7 +20,10 @@ import typing
 from tbot import log
 from tbot.log import u, c
 
-__all__ = ("testcase_begin", "testcase_end", "command")
+if typing.TYPE_CHECKING:
+    from tbot.machine import channel
+
+__all__ = ("testcase_begin", "testcase_end", "command", "shell_ready")
 
 
 def testcase_begin(name: str) -> None:
@@ -114,6 +117,30 @@ def command(mach: str, cmd: str) -> log.EventIO:
     return ev
 
 
+def shell_ready(mach: str, result: "channel.channel.ProbeResult") -> None:
+    """
+    Log how long it took for a machine's shell to respond.
+
+    :param str mach: Name of the machine
+    :param ProbeResult result: Result of waiting for the shell
+    """
+    msg = f"shell ready after {result.duration * 1000:.1f}ms ({result.probes} probe"
+    if result.probes != 1:
+        msg += "s"
+    if result.rtt is not None:
+        msg += f", echo after {result.rtt * 1000:.1f}ms"
+    msg += ")"
+
+    log.EventIO(
+        ["shell", "ready", mach],
+        "[" + c(mach).yellow + "] " + c(msg).dark,
+        verbosity=log.Verbosity.STDOUT,
+        duration=result.duration,
+        probes=result.probes,
+        rtt=result.rtt,
+    )
+
+
 def tbot_start() -> None:
     print(log.c("tbot").yellow.bold + " starting ...")
     log.NESTING += 1
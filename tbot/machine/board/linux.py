@@ -44,6 +44,16 @@ class LinuxStartupEvent(tbot.log.EventIO):
 class LinuxBoot(machine.Machine):
     _linux_init_event: typing.Optional[tbot.log.EventIO] = None
 
+    transfer_window: int = 2 * 1024
+    """
+    Number of bytes sent in one go by
+    :py:meth:`Path.write_bytes() <tbot.machine.linux.Path.write_bytes>`.
+
+    Serial consoles usually have no flow control, so this is kept well below
+    the 4 KiB input buffer of the remote tty.  Otherwise, data is dropped if
+    the board does not drain the UART fast enough.
+    """
+
     def _linux_boot_event(self) -> tbot.log.EventIO:
         if self._linux_init_event is None:
             self._linux_init_event = LinuxStartupEvent(self)
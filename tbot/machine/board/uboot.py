@@ -14,6 +14,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import collections.abc
 import contextlib
 import re
 import time
@@ -138,6 +139,30 @@ def _hush_quote(s: str) -> str:
 
 ArgTypes = typing.Union[str, special.Special]
 
+_printenv_line = re.compile(r"([^=\s]+)=(.*)")
+_printenv_missing = re.compile(r'^## Error: "(.*)" not defined\n?', re.MULTILINE)
+
+
+def _parse_printenv(output: str) -> typing.Dict[str, str]:
+    # Without arguments, `printenv` ends with a summary of the environment size
+    head, sep, _ = output.rpartition("\nEnvironment size: ")
+    if sep != "":
+        output = head
+    if output.endswith("\n"):
+        output = output[:-1]
+
+    env: typing.Dict[str, str] = {}
+    var = None
+    for line in output.split("\n"):
+        m = _printenv_line.fullmatch(line)
+        if m is not None:
+            var = m.group(1)
+            env[var] = m.group(2)
+        elif var is not None:
+            # Continuation of a value which contains newlines
+            env[var] += "\n" + line
+    return env
+
 
 class UBootShell(shell.Shell, UbootStartup):
     """
@@ -179,6 +204,36 @@ class UBootShell(shell.Shell, UbootStartup):
     bootlog: str
     """Transcript of console output during boot."""
 
+    spool_threshold: int = 1024 * 1024
+    """
+    Size in bytes above which
+    :py:meth:`~tbot.machine.board.UBootShell.exec_spooled` moves command
+    output to a temporary file.
+    """
+
+    probe_interval: float = 0.2
+    """
+    Time in seconds to wait for the prompt before interrupting U-Boot with
+    ``CTRL-C``.
+    """
+
+    probe_interval_max: float = 0.2
+    """
+    Upper limit for the time in seconds between two interrupts.
+
+    By default, interrupts do not back off:  Without
+    :py:class:`~tbot.machine.board.UBootAutobootIntercept`, they are what
+    stops autoboot, and a short ``bootdelay`` would be missed otherwise.
+    """
+
+    cmdline_size: int = 1024
+    """
+    Maximum length of a command-line U-Boot accepts (``CONFIG_SYS_CBSIZE``).
+
+    :py:meth:`~tbot.machine.board.UBootShell.env_many` splits its work into
+    as few commands as fit into lines of this length.
+    """
+
     @contextlib.contextmanager
     def _init_shell(self) -> typing.Iterator:
         with self._uboot_startup_event() as ev, self.ch.with_stream(ev):
@@ -220,16 +275,22 @@ class UBootShell(shell.Shell, UbootStartup):
                 0x7F,  # DEL  | Delete
             ]
 
-            while True:
-                if self.boot_timeout is not None:
-                    assert self._timeout_start is not None
-                    if (time.monotonic() - self._timeout_start) > self.boot_timeout:
-                        raise TimeoutError("U-Boot did not reach shell in time")
-                try:
-                    self.ch.read_until_prompt(timeout=0.2)
-                    break
-                except TimeoutError:
-                    self.ch.sendintr()
+            timeout = None
+            if self.boot_timeout is not None:
+                assert self._timeout_start is not None
+                timeout = self.boot_timeout - (time.monotonic() - self._timeout_start)
+
+            try:
+                res = self.ch.read_until_prompt_probing(
+                    self.ch.sendintr,
+                    timeout=timeout,
+                    interval=self.probe_interval,
+                    max_interval=self.probe_interval_max,
+                    initial_probe=False,
+                )
+            except TimeoutError:
+                raise TimeoutError("U-Boot did not reach shell in time") from None
+            tbot.log_event.shell_ready(self.name, res)
 
         yield None
 
@@ -277,6 +338,42 @@ class UBootShell(shell.Shell, UbootStartup):
 
         return (int(retcode), out)
 
+    def exec_spooled(self, *args: ArgTypes) -> typing.Tuple[int, channel.SpooledOutput]:
+        """
+        Run a command in U-Boot whose output might be huge.
+
+        Same as :py:meth:`~tbot.machine.board.UBootShell.exec` but the output
+        is returned as a :py:class:`~tbot.machine.channel.SpooledOutput`.
+        Output larger than
+        :py:attr:`~tbot.machine.board.UBootShell.spool_threshold` is kept in
+        a temporary file instead of memory and the log only contains its
+        beginning and end.
+
+        **Example**:
+
+        .. code-block:: python
+
+            retcode, dump = ub.exec_spooled("md.b", "0x80000000", "0x1000000")
+            with dump:
+                for line in dump:
+                    ...
+
+        :rtype: tuple(int, tbot.machine.channel.SpooledOutput)
+        """
+        cmd = self.escape(*args)
+
+        with tbot.log_event.command(self.name, cmd) as ev:
+            ev.retain = False
+            self.ch.sendline(cmd, read_back=True)
+            with self.ch.with_stream(ev, show_prompt=False):
+                out = self.ch.read_until_prompt_spooled(self.spool_threshold)
+            ev.data["stdout"] = out.excerpt()
+
+            self.ch.sendline("echo $?", read_back=True)
+            retcode = self.ch.read_until_prompt()
+
+        return (int(retcode), out)
+
     def exec0(self, *args: ArgTypes) -> str:
         """
         Run a command and assert its return code to be 0.
@@ -348,6 +445,95 @@ class UBootShell(shell.Shell, UbootStartup):
         # name and trailing newline.
         return output[len(var) + 1 : -1]
 
+    def env_many(
+        self,
+        variables: typing.Union[typing.Mapping[str, ArgTypes], typing.Iterable[str]],
+    ) -> typing.Dict[str, str]:
+        """
+        Get or set many environment variables with as few commands as possible.
+
+        Variables are set and read back on a single command-line as long as it
+        does not grow longer than
+        :py:attr:`~tbot.machine.board.UBootShell.cmdline_size`.
+
+        **Example**:
+
+        .. code-block:: python
+
+            # Set some variables
+            ub.env_many({"serverip": "192.168.0.1", "ipaddr": "192.168.0.2"})
+
+            # Get the values of some variables
+            values = ub.env_many(["bootcmd", "bootargs"])
+
+        :param variables: Either a mapping from variable names to the values
+            they should be set to or a list of variable names to read.
+        :rtype: dict(str, str)
+        :returns: The current (new) values of the variables.  Variables which
+            are not set are returned as an empty string.
+        """
+        if isinstance(variables, collections.abc.Mapping):
+            setenvs = [
+                (var, self.escape("setenv", var, value))
+                for var, value in variables.items()
+            ]
+        else:
+            setenvs = [(var, "") for var in variables]
+
+        values: typing.Dict[str, str] = {}
+
+        def run(names: typing.List[str], commands: typing.List[str]) -> None:
+            cmd = "; ".join(commands + [self.escape("printenv", *names)])
+            ec, output = self.exec(special.Raw(cmd))
+
+            # `printenv` fails for variables which are not set but still
+            # prints all the others.  Like in a shell, those read as empty.
+            missing = set(_printenv_missing.findall(output))
+            env = _parse_printenv(_printenv_missing.sub("", output))
+            for var in names:
+                if var in env:
+                    values[var] = env[var]
+                elif var in missing:
+                    values[var] = ""
+                else:
+                    raise Exception(f"command {cmd!r} failed")
+            if ec != 0 and missing == set():
+                raise Exception(f"command {cmd!r} failed")
+
+        names: typing.List[str] = []
+        commands: typing.List[str] = []
+        length = len("printenv")
+        for var, setenv in setenvs:
+            extra = len(setenv) + len(var) + (3 if setenv else 1)
+            if names != [] and length + extra > self.cmdline_size - 1:
+                run(names, commands)
+                names, commands, length = [], [], len("printenv")
+            names.append(var)
+            if setenv:
+                commands.append(setenv)
+            length += extra
+        if names != []:
+            run(names, commands)
+
+        return values
+
+    def env_dump(self) -> typing.Dict[str, str]:
+        """
+        Read the whole environment with a single ``printenv``.
+
+        **Example**:
+
+        .. code-block:: python
+
+            env = ub.env_dump()
+            if "bootcmd" in env:
+                ...
+
+        :rtype: dict(str, str)
+        :returns: All environment variables and their values.
+        """
+        return _parse_printenv(self.exec0("printenv"))
+
     def boot(self, *args: ArgTypes) -> channel.Channel:
         """
         Boot a payload from U-Boot.
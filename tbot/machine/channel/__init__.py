@@ -6,6 +6,7 @@ from .channel import (
     ChannelIO,
     ChannelTakenException,
     DeathStringException,
+    SpooledOutput,
 )
 
 from .subprocess import SubprocessChannel
@@ -20,5 +21,6 @@ __all__ = (
     "ChannelTakenException",
     "DeathStringException",
     "ParamikoChannel",
+    "SpooledOutput",
     "SubprocessChannel",
 )
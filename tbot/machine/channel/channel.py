@@ -17,11 +17,11 @@
 import abc
 import collections
 import contextlib
-import copy
 import itertools
 import re
 import select
 import sys
+import tempfile
 import termios
 import time
 import tty
@@ -41,12 +41,13 @@ class ChannelIO(typing.ContextManager):
 
     # generic channel interface {{{
     @abc.abstractmethod
-    def write(self, buf: bytes) -> int:
+    def write(self, buf: typing.Union[bytes, memoryview]) -> int:
         """
         Write some bytes to this channel.
 
         ``write()`` returns the number of bytes written.  This number might be lower
-        than ``len(buf)``.
+        than ``len(buf)``.  ``buf`` might also be a :py:class:`memoryview` when
+        the remainder of a partial write is retried.
 
         :param bytes buf: Buffer with bytes to be written.
         :raises ChannelClosedException:  If the channel was closed previous to, or
@@ -69,6 +70,24 @@ class ChannelIO(typing.ContextManager):
         """
         pass
 
+    def readinto(self, buf: memoryview, timeout: typing.Optional[float] = None) -> int:
+        """
+        Receive some bytes from this channel into a preallocated buffer.
+
+        Behaves like :py:meth:`~tbot.machine.channel.ChannelIO.read` with ``n``
+        being the length of ``buf``.  The default implementation calls
+        ``read()`` and copies the result.  Implementations should override it
+        to avoid the intermediate ``bytes`` object.
+
+        :param memoryview buf: Buffer to receive the data into.
+        :param float timeout:  Optional timeout.
+        :returns: Number of bytes which were placed in ``buf``.
+        :rtype: int
+        """
+        data = self.read(len(buf), timeout)
+        buf[: len(data)] = data
+        return len(data)
+
     @abc.abstractmethod
     def close(self) -> None:
         """
@@ -124,16 +143,20 @@ class ChannelIO(typing.ContextManager):
 _CHANID_COLORS = ["red", "green", "yellow", "blue", "magenta", "cyan"]
 
 
-def _debug_log(chan: ChannelIO, data: bytes, is_out: bool = False) -> bytes:
+Buffer = typing.Union[bytes, bytearray, memoryview]
+BufT = typing.TypeVar("BufT", bound=Buffer)
+
+
+def _debug_log(chan: ChannelIO, data: BufT, is_out: bool = False) -> BufT:
     if tbot.log.VERBOSITY >= tbot.log.Verbosity.CHANNEL:
-        json_data = data.decode("utf-8", errors="replace")
+        json_data = str(data, "utf-8", errors="replace")
 
         # Find a color for this channel to make distinguishing them easier
         chanid_color = _CHANID_COLORS[(id(chan) >> 6) % len(_CHANID_COLORS)]
         chanid = tbot.log.c(f"{id(chan) & 0xffffff:x}")
         chanid_colored = "(" + getattr(chanid, chanid_color).dark + ")"
 
-        msg = tbot.log.c(repr(data)[1:])
+        msg = tbot.log.c(repr(bytes(data))[1:])
         tbot.log.EventIO(
             ["__debug__"],
             (
@@ -162,7 +185,7 @@ class ChannelTakenException(Exception):
 class ChannelBorrowed(ChannelIO):
     exception: typing.Type[Exception] = ChannelBorrowedException
 
-    def write(self, buf: bytes) -> int:
+    def write(self, buf: typing.Union[bytes, memoryview]) -> int:
         raise self.exception()
 
     def read(self, n: int, timeout: typing.Optional[float] = None) -> bytes:
@@ -230,6 +253,122 @@ def _convert_search_string(string: ConvenientSearchString) -> SearchString:
         return string
 
 
+class _PatternMatcher:
+    """
+    Incremental matcher for a list of search-strings.
+
+    The matcher remembers, for each pattern, up to which offset the buffer was
+    already searched.  On the next call, only the new data (plus the maximum
+    width of the pattern, to catch matches spanning the old and new data) is
+    scanned.  This keeps the cost per chunk constant, no matter how much data
+    was received before.
+    """
+
+    __slots__ = ("patterns", "_positions")
+
+    def __init__(self, patterns: typing.List[SearchString]) -> None:
+        self.patterns = patterns
+        self._positions = [0] * len(patterns)
+
+    def search(
+        self, buf: bytearray
+    ) -> typing.Optional[
+        typing.Tuple[int, int, int, typing.Union[str, typing.Match[bytes]]]
+    ]:
+        """
+        Search ``buf`` for any of the patterns.
+
+        ``buf`` must only ever grow between calls.  Patterns are tried in
+        order and the first one which matches wins.
+
+        :returns: ``None`` if no pattern matched, otherwise a tuple of pattern
+            index, start and end of the match and the match itself.
+        """
+        for i, pat in enumerate(self.patterns):
+            pos = self._positions[i]
+            if isinstance(pat, bytes):
+                index = buf.find(pat, pos)
+                if index != -1:
+                    return (
+                        i,
+                        index,
+                        index + len(pat),
+                        pat.decode("utf-8", errors="replace"),
+                    )
+                self._positions[i] = max(0, len(buf) - len(pat) + 1)
+            elif isinstance(pat, BoundedPattern):
+                match = pat.pattern.search(buf, pos)
+                if match is not None:
+                    return (i, match.start(), match.end(), match)
+                self._positions[i] = max(0, len(buf) - len(pat))
+            else:
+                raise AssertionError(
+                    f"expect pattern has unknown type: {pat.__class__!r}"
+                )
+
+        return None
+
+
+def _decode(buf: Buffer) -> str:
+    return tbot.log.OutputNormalizer().decode(buf, final=True)
+
+
+def _prefix_table(prompt: bytes) -> typing.Dict[int, typing.List[bytes]]:
+    """
+    Index all prefixes of ``prompt`` by their last byte.
+
+    The prefixes in each list are sorted longest first.
+    """
+    table: typing.Dict[int, typing.List[bytes]] = {}
+    for i in reversed(range(1, len(prompt) + 1)):
+        table.setdefault(prompt[i - 1], []).append(prompt[:i])
+    return table
+
+
+def _prompt_overlap(buf: bytearray, table: typing.Dict[int, typing.List[bytes]]) -> int:
+    """
+    Return the length of the longest prefix of the prompt which ``buf`` ends with.
+
+    Only prefixes ending in the same byte as ``buf`` are candidates.  Most of
+    the time, this is none of them (output usually ends in a newline) and the
+    check is done with a single lookup.
+    """
+    if buf == b"":
+        return 0
+    for prefix in table.get(buf[-1], ()):
+        if buf.endswith(prefix):
+            return len(prefix)
+    return 0
+
+
+def _find_prompt(
+    buf: bytearray, prompt: SearchString
+) -> typing.Optional[typing.Tuple[int, int]]:
+    """
+    Check whether ``buf`` ends with ``prompt``.
+
+    Only the tail of the buffer is examined: byte-prompts are checked with
+    ``endswith()`` and pattern-prompts (which are anchored with ``$``) are only
+    searched for in the last ``len(prompt) + 1`` bytes.
+
+    :returns: Start and end offset of the prompt in ``buf`` or ``None`` if it
+        was not found.
+    """
+    if isinstance(prompt, bytes):
+        if buf.endswith(prompt):
+            return (len(buf) - len(prompt), len(buf))
+    elif isinstance(prompt, BoundedPattern):
+        # One additional byte because `$` also matches before a trailing
+        # newline.
+        match = prompt.pattern.search(buf, max(0, len(buf) - len(prompt) - 1))
+        if match is not None:
+            return match.span()
+    else:
+        raise AssertionError(f"prompt has unknown type: {prompt.__class__!r}")
+
+    return None
+
+
 class DeathStringException(Exception):
     __slots__ = "match"
 
@@ -240,6 +379,75 @@ class DeathStringException(Exception):
         return f"DeathStringException({self.match!r})"
 
 
+DeathStringList = typing.List[
+    typing.Tuple[SearchString, typing.Type[DeathStringException]]
+]
+
+
+class _DeathStringMatcher:
+    """
+    Compiled matcher for a set of death strings.
+
+    All literal death strings are combined into a single alternation so
+    incoming data is scanned once for all of them.  Pattern death strings are
+    kept as separate expressions because merging them would defeat the regex
+    engine's literal-prefix optimizations.  Only when something was found, the
+    individual death strings are checked (in order) to figure out which one
+    matched.
+
+    The matcher is immutable; the channel builds a new one whenever the set of
+    death strings changes.
+    """
+
+    __slots__ = ("death_strings", "length", "_scanners")
+
+    def __init__(self, death_strings: DeathStringList) -> None:
+        self.death_strings = list(death_strings)
+        self.length = max(len(string) for string, _ in self.death_strings)
+
+        self._scanners: typing.List[typing.Pattern[bytes]] = []
+        literals = []
+        for string, _ in self.death_strings:
+            if isinstance(string, bytes):
+                literals.append(re.escape(string))
+            elif isinstance(string, BoundedPattern):
+                self._scanners.append(string.pattern)
+            else:
+                raise AssertionError(
+                    f"death string has unknown type: {string.__class__!r}"
+                )
+
+        if literals:
+            self._scanners.insert(0, re.compile(b"|".join(literals)))
+
+    def search(
+        self, buf: bytearray
+    ) -> typing.Optional[typing.Tuple[int, DeathStringException]]:
+        """
+        Search ``buf`` for any of the death strings.
+
+        :returns: ``None`` if no death string was found.  Otherwise, the end
+            offset of the match and the exception to raise for it.
+        """
+        for scanner in self._scanners:
+            if scanner.search(buf) is not None:
+                break
+        else:
+            return None
+
+        for string, exception_type in self.death_strings:
+            if isinstance(string, bytes):
+                index = buf.find(string)
+                if index != -1:
+                    return (index + len(string), exception_type(string))
+            else:
+                match = string.pattern.search(buf)
+                if match is not None:
+                    return (match.end(), exception_type(match[0]))
+
+        raise AssertionError("combined death string pattern is inconsistent")
+
+
 class ExpectResult(typing.NamedTuple):
     """
     Result from a call to :py:meth:`~tbot.machine.channel.Channel.expect`.
@@ -261,15 +469,142 @@ class ExpectResult(typing.NamedTuple):
     """Everything from the input stream before the match, up to the matched pattern."""
 
     after: str
-    """Any potential bytes which were read following the matched pattern."""
+    """
+    Any potential bytes which were read following the matched pattern.
+
+    These bytes are not consumed; the next read from the channel will return
+    them again.
+    """
+
+
+class ProbeResult(typing.NamedTuple):
+    """
+    Result from a call to
+    :py:meth:`~tbot.machine.channel.Channel.read_until_prompt_probing`.
+    """
+
+    output: str
+    """Everything read from the channel up to the prompt."""
+
+    duration: float
+    """Time in seconds it took for the prompt to show up."""
+
+    probes: int
+    """Number of probes which were sent."""
+
+    rtt: typing.Optional[float]
+    """
+    Time in seconds from sending the first probe until the first byte was
+    received (usually the echo of the probe).  ``None`` if nothing was
+    received before the prompt showed up or if no probe was sent.
+    """
+
+
+class SpooledOutput:
+    """
+    Output which is moved to a temporary file once it grows too large.
+
+    Returned by :py:meth:`~tbot.machine.channel.Channel.read_until_prompt_spooled`.
+    As long as the output is smaller than the threshold, it is kept in memory
+    and ``str(output)`` is cheap.  Larger output is written to an anonymous
+    temporary file which is removed when the ``SpooledOutput`` is closed or
+    garbage collected.
+
+    Prefer iterating over the lines of large output instead of converting it
+    to a ``str`` as a whole:
+
+    .. code-block:: python
+
+        for line in output:
+            if "error:" in line:
+                ...
+
+    :param int threshold: Size in bytes above which the output is moved to
+        a temporary file.
+    """
+
+    __slots__ = ("_file", "_threshold", "size")
+
+    def __init__(self, threshold: int) -> None:
+        self._file = tempfile.SpooledTemporaryFile(max_size=threshold, mode="w+b")
+        self._threshold = threshold
+        self.size = 0
+        """Size of the output in bytes (UTF-8 encoded)."""
+
+    def write(self, text: str) -> None:
+        """Append ``text`` to the output."""
+        if text != "":
+            self._file.seek(0, 2)
+            self.size += self._file.write(text.encode("utf-8"))
+
+    @property
+    def spooled(self) -> bool:
+        """Whether the output was moved to a temporary file."""
+        return self.size > self._threshold
+
+    def __str__(self) -> str:
+        self._file.seek(0)
+        return self._file.read().decode("utf-8")
+
+    def __iter__(self) -> typing.Iterator[str]:
+        """Iterate over the lines of the output, including their line endings."""
+        self._file.seek(0)
+        for line in self._file:
+            yield line.decode("utf-8")
+
+    def head(self, n: int) -> str:
+        """Return (up to) the first ``n`` bytes of the output."""
+        self._file.seek(0)
+        return self._file.read(n).decode("utf-8", errors="ignore")
+
+    def tail(self, n: int) -> str:
+        """Return (up to) the last ``n`` bytes of the output."""
+        self._file.seek(max(0, self.size - n))
+        return self._file.read().decode("utf-8", errors="ignore")
+
+    def excerpt(self, n: int = 32768) -> str:
+        """
+        Return the output if it is at most ``n`` bytes long or its beginning
+        and end otherwise.
+
+        This is what gets stored in the log for large outputs.
+        """
+        if self.size <= n:
+            return str(self)
+        omitted = self.size - 2 * (n // 2)
+        return (
+            self.head(n // 2)
+            + f"\n[... {omitted} bytes omitted ...]\n"
+            + self.tail(n // 2)
+        )
+
+    def close(self) -> None:
+        """Release the memory or temporary file holding the output."""
+        self._file.close()
+
+    def __enter__(self) -> "SpooledOutput":
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"<SpooledOutput size={self.size} spooled={self.spooled}>"
 
 
 class Channel(typing.ContextManager):
     __slots__ = (
         "_c",
+        "_death_matcher",
+        "_last_prompt",
         "_log_prompt",
+        "_readahead",
+        "_readbuf",
         "_ringbuf",
+        "_write_blacklist_table",
         "_stream",
+        "_prompt_table",
+        "_stream_normalizer",
         "_streambuf",
         "death_strings",
         "prompt",
@@ -278,14 +613,22 @@ class Channel(typing.ContextManager):
     def __init__(self, channel_io: ChannelIO) -> None:
         self._c = channel_io
         self.prompt: typing.Optional[SearchString] = None
-        self.death_strings: typing.List[
-            typing.Tuple[SearchString, typing.Type[DeathStringException]]
-        ] = []
-        self._ringbuf: typing.Deque[int] = collections.deque([], maxlen=2)
+        # The prompt as it was last read by read_until_prompt() & friends.
+        # Shells can use this to extract information from a prompt pattern.
+        self._last_prompt: typing.Optional[bytes] = None
+        self.death_strings: DeathStringList = []
+        self._death_matcher: typing.Optional[_DeathStringMatcher] = None
+        self._ringbuf = bytearray()
         self._streams: typing.List[typing.TextIO] = []
         self._streambuf = bytearray()
+        self._prompt_table: typing.Tuple[
+            bytes, typing.Dict[int, typing.List[bytes]]
+        ] = (b"", {})
+        self._stream_normalizer = tbot.log.OutputNormalizer(newlines=False)
         self._log_prompt = True
-        self._write_blacklist: typing.List[int] = []
+        self._write_blacklist_table = b""
+        self._readahead = bytearray()
+        self._readbuf = bytearray(self.READ_CHUNK_SIZE)
 
     # raw byte-level IO {{{
     def write(self, buf: bytes, _ignore_blacklist: bool = False) -> None:
@@ -299,17 +642,37 @@ class Channel(typing.ContextManager):
         :raises ChannelClosedException:  If the channel was closed previous to, or
             during writing.
         """
-        if not _ignore_blacklist:
-            for blacklisted in self._write_blacklist:
-                if blacklisted in buf:
-                    raise Exception(
-                        f"Attempting to write a forbidden byte ({chr(blacklisted)!r})!"
-                    )
+        table = self._write_blacklist_table
+        if not _ignore_blacklist and table != b"":
+            # Check for all forbidden bytes in a single pass
+            if len(buf.translate(None, table)) != len(buf):
+                for blacklisted in table:
+                    if blacklisted in buf:
+                        raise Exception(
+                            f"Attempting to write a forbidden byte ({chr(blacklisted)!r})!"
+                        )
 
         cursor = 0
         while cursor < len(buf):
-            bytes_written = self._c.write(buf[cursor:])
-            cursor += bytes_written
+            if cursor == 0:
+                cursor = self._c.write(buf)
+            else:
+                # Partial write; continue through a view to not copy the rest
+                cursor += self._c.write(memoryview(buf)[cursor:])
+
+    @property
+    def _write_blacklist(self) -> typing.List[int]:
+        """
+        Bytes which must never be sent on this channel.
+
+        The list is stored as a deletion table for ``bytes.translate()`` so
+        :py:meth:`write` can check for all of them at once.
+        """
+        return list(self._write_blacklist_table)
+
+    @_write_blacklist.setter
+    def _write_blacklist(self, blacklist: typing.List[int]) -> None:
+        self._write_blacklist_table = bytes(blacklist)
 
     # Size of individual read calls.
     READ_CHUNK_SIZE = 4096
@@ -335,16 +698,16 @@ class Channel(typing.ContextManager):
             will return early after ``timeout`` seconds.
         :rtype: bytes
         """
+        buf = bytearray()
         if n < 0:
             # Block first and then read non-blocking
-            buf = bytearray(self._c.read(self.READ_CHUNK_SIZE, timeout))
-            self._write_stream(buf)
-            self._check(buf)
-            reader = self.read_iter(timeout=0.0)
+            for chunk in self._read_chunks(timeout=timeout):
+                buf += chunk
+                break
+            reader = self._read_chunks(timeout=0.0)
         else:
             # Read n bytes non-blocking
-            buf = bytearray()
-            reader = self.read_iter(max=n, timeout=timeout)
+            reader = self._read_chunks(max=n, timeout=timeout)
 
         try:
             for chunk in reader:
@@ -370,9 +733,39 @@ class Channel(typing.ContextManager):
         :param int max: Maximum number of bytes to read.
         :param float timeout: Optional timeout.
         """
+        for chunk in self._read_chunks(max, timeout):
+            yield bytes(chunk)
+
+    def _read_chunks(
+        self, max: int = sys.maxsize, timeout: typing.Optional[float] = None
+    ) -> typing.Iterator[memoryview]:
+        """
+        Iterate over chunks of bytes read from the channel without copying them.
+
+        Same as :py:meth:`read_iter` but the chunks are views into a buffer
+        which is reused for each read.  A chunk is only valid until the next
+        iteration.
+        """
         start_time = time.monotonic()
 
         bytes_read = 0
+        if self._readahead != b"":
+            # Hand out data which was read ahead by a previous call first.  It
+            # was already sent to the streams and checked for death strings
+            # when it was initially received.
+            if len(self._readahead) <= max:
+                ahead = self._readahead
+                self._readahead = bytearray()
+            else:
+                ahead = self._readahead[:max]
+                del self._readahead[:max]
+            bytes_read += len(ahead)
+            yield memoryview(ahead)
+
+            if bytes_read == max:
+                return
+
+        view = memoryview(self._readbuf)
         while True:
             timeout_remaining = None
             if timeout is not None:
@@ -380,8 +773,8 @@ class Channel(typing.ContextManager):
                 if timeout_remaining <= 0:
                     raise TimeoutError()
 
-            max_read = min(self.READ_CHUNK_SIZE, max - bytes_read)
-            new = self._c.read(max_read, timeout_remaining)
+            max_read = min(len(view), max - bytes_read)
+            new = view[: self._c.readinto(view[:max_read], timeout_remaining)]
             bytes_read += len(new)
             self._write_stream(new)
             self._check(new)
@@ -391,6 +784,14 @@ class Channel(typing.ContextManager):
             if bytes_read == max:
                 break
 
+    def _unread(self, buf: Buffer) -> None:
+        """
+        Push back bytes which were read ahead.
+
+        The next read from this channel will return these bytes first.
+        """
+        self._readahead[:0] = buf
+
     # }}}
 
     # log-event streams {{{
@@ -424,54 +825,68 @@ class Channel(typing.ContextManager):
             self._log_prompt = show_prompt
             yield self
         finally:
-            self._streams.remove(stream)
-
             # If we don't want to log the prompt, advance the buffer to skip the
             # prompt string.
             if not self._log_prompt and self.prompt is not None:
-                try:
-                    self._streambuf = self._streambuf[len(self.prompt) :]
-                except IndexError:
-                    self._streambuf = bytearray()
+                self._skip_prompt()
+
+            self._streams.remove(stream)
+            if self._streams == []:
+                # Nobody is left to receive the rest of a character which was
+                # split across chunks.
+                rest = self._stream_normalizer.decode(b"", final=True)
+                if rest != "":
+                    stream.write(rest)
 
             self._log_prompt = previous_log_prompt
 
-    def _write_stream(self, buf: bytes) -> None:
+    def _skip_prompt(self) -> None:
+        assert self.prompt is not None
+        streambuf = self._streambuf
+        end = len(self.prompt)
+        if isinstance(self.prompt, BoundedPattern):
+            # A pattern can match less than the held back window.  Output
+            # preceding the prompt still needs to be passed on.
+            span = _find_prompt(streambuf, self.prompt)
+            if span is not None:
+                with memoryview(streambuf) as view:
+                    text = self._stream_normalizer.decode(view[: span[0]])
+                for stream in self._streams:
+                    stream.write(text)
+                end = span[1]
+        del streambuf[:end]
+
+    def _write_stream(self, buf: Buffer) -> None:
         if self._streams != []:
             if self._log_prompt or self.prompt is None:
+                text = self._stream_normalizer.decode(buf)
                 for stream in self._streams:
-                    stream.write(buf.decode("utf-8", errors="replace"))
+                    stream.write(text)
             else:
-                self._streambuf += buf
+                streambuf = self._streambuf
+                streambuf += buf
                 if isinstance(self.prompt, bytes):
-                    # Peek ahead and check whether the end of the stream matches
-                    # the beginning of the prompt
-                    maxlen = min(len(self.prompt), len(self._streambuf))
-                    length = maxlen
-                    for i in reversed(range(1, maxlen + 1)):
-                        if self._streambuf[-i:] == self.prompt[:i]:
-                            break
-                        length = i - 1
-
-                    if length != 0:
-                        fragment = self._streambuf[:-length]
-                    else:
-                        fragment = self._streambuf
-
-                    for stream in self._streams:
-                        stream.write(fragment.decode("utf-8", errors="replace"))
-
-                    if length != 0:
-                        self._streambuf = self._streambuf[-length:]
-                    else:
-                        self._streambuf.clear()
+                    # Hold back the longest tail of the stream which matches
+                    # the beginning of the prompt.
+                    if self._prompt_table[0] != self.prompt:
+                        self._prompt_table = (
+                            self.prompt,
+                            _prefix_table(self.prompt),
+                        )
+                    length = _prompt_overlap(streambuf, self._prompt_table[1])
                 else:
-                    # Naive approach when we can't guess whether the start of
-                    # the prompt might be included in the output
-                    fragment = self._streambuf[: -len(self.prompt)]
+                    # We can't guess whether the start of a pattern prompt is
+                    # included in the output so hold back as much as the
+                    # pattern could possibly match.
+                    length = min(len(self.prompt), len(streambuf))
+
+                cut = len(streambuf) - length
+                if cut > 0:
+                    with memoryview(streambuf) as view:
+                        text = self._stream_normalizer.decode(view[:cut])
                     for stream in self._streams:
-                        stream.write(fragment.decode("utf-8", errors="replace"))
-                    self._streambuf = self._streambuf[-len(self.prompt) :]
+                        stream.write(text)
+                    del streambuf[:cut]
 
     # }}}
 
@@ -523,9 +938,18 @@ class Channel(typing.ContextManager):
 
     # death string handling {{{
 
-    # Channel keeps a ringbuffer with enough space to match the longest death-string
-    # and checks it for each chunk of data coming in.  If any of the strings matches,
-    # the channel will throw an exception.
+    # Channel keeps a window of the last bytes received, large enough to match
+    # the longest death-string across chunk boundaries.  All death strings are
+    # compiled into a single matcher which is only rebuilt when the set of
+    # death strings changes.  If any of the strings matches, the channel will
+    # throw an exception.
+
+    def _update_death_strings(self) -> None:
+        if self.death_strings == []:
+            self._death_matcher = None
+            self._ringbuf.clear()
+        else:
+            self._death_matcher = _DeathStringMatcher(self.death_strings)
 
     def add_death_string(
         self,
@@ -537,11 +961,8 @@ class Channel(typing.ContextManager):
         if exception_type is None:
             exception_type = DeathStringException
 
-        previous_length = typing.cast(int, self._ringbuf.maxlen)
         self.death_strings.insert(0, (string, exception_type))
-        new_length = len(string) * 2
-        if new_length > previous_length:
-            self._ringbuf = collections.deque(self._ringbuf, maxlen=new_length)
+        self._update_death_strings()
 
     @contextlib.contextmanager
     def with_death_string(
@@ -554,44 +975,40 @@ class Channel(typing.ContextManager):
         if exception_type is None:
             exception_type = DeathStringException
 
-        previous_length = typing.cast(int, self._ringbuf.maxlen)
         self.death_strings.insert(0, (string, exception_type))
-        new_length = len(string) * 2
-        if new_length > previous_length:
-            self._ringbuf = collections.deque(self._ringbuf, maxlen=new_length)
+        self._update_death_strings()
 
         try:
             yield self
         finally:
             self.death_strings.remove((string, exception_type))
-            if new_length > previous_length:
-                self._ringbuf = collections.deque(self._ringbuf, maxlen=previous_length)
-
-    def _check(self, incoming: bytes) -> None:
-        if self.death_strings == []:
-            return
-
-        # Chunk size is the longest death-string.
-        chunk_size = typing.cast(int, self._ringbuf.maxlen) // 2
-
-        for chunk in (
-            incoming[i : i + chunk_size] for i in range(0, len(incoming), chunk_size)
-        ):
-            self._ringbuf.extend(chunk)
-            ringbuf_bytes = bytes(self._ringbuf)
-
-            for string, exception_type in self.death_strings:
-                if isinstance(string, bytes):
-                    if string in ringbuf_bytes:
-                        raise exception_type(string)
-                elif isinstance(string, BoundedPattern):
-                    match = string.pattern.search(ringbuf_bytes)
-                    if match is not None:
-                        raise exception_type(match[0])
-                else:
-                    raise AssertionError(
-                        f"death string has unknown type: {string.__class__!r}"
-                    )
+            self._update_death_strings()
+
+    def _check(self, incoming: Buffer) -> None:
+        matcher = self._death_matcher
+        if matcher is None or matcher.death_strings != self.death_strings:
+            # The list of death strings was modified directly
+            if self.death_strings == []:
+                return
+            self._update_death_strings()
+            matcher = typing.cast(_DeathStringMatcher, self._death_matcher)
+
+        ringbuf = self._ringbuf
+        ringbuf += incoming
+        result = matcher.search(ringbuf)
+        if result is not None:
+            # Drop everything up to the end of the match so the same
+            # occurrence does not trigger again.
+            del ringbuf[: result[0]]
+
+        # Only keep as much as is needed to find a match spanning into the
+        # next chunk.
+        keep = matcher.length - 1
+        if len(ringbuf) > keep:
+            del ringbuf[: len(ringbuf) - keep]
+
+        if result is not None:
+            raise result[1]
 
     # }}}
 
@@ -693,28 +1110,116 @@ class Channel(typing.ContextManager):
         else:
             end = lineending
 
-        # This implementation is quite naive but any
-        # other way would possibly read too much :/
+        # Fast path: The line is already contained in the read-ahead buffer
+        index = self._readahead.find(end)
+        if index != -1:
+            index += len(end)
+            with memoryview(self._readahead) as view:
+                line = _decode(view[:index])
+            del self._readahead[:index]
+            return line
 
-        start_time = time.monotonic()
-        line = bytearray()
+        buf = bytearray()
+        for chunk in self._read_chunks(timeout=timeout):
+            # Only search the new data and the bytes needed to find a line
+            # ending which spans the chunk boundary.
+            start = max(0, len(buf) - len(end) + 1)
+            buf += chunk
+
+            index = buf.find(end, start)
+            if index != -1:
+                # Anything following the line ending is pushed back for the
+                # next read.
+                index += len(end)
+                with memoryview(buf) as view:
+                    self._unread(view[index:])
+                    return _decode(view[:index])
+
+        return _decode(buf)
+
+    def iter_lines(
+        self, until_prompt: bool = False, timeout: typing.Optional[float] = None
+    ) -> typing.Generator[str, None, None]:
+        """
+        Iterate over lines of output as they arrive.
 
-        while True:
-            timeout_remaining = None
-            if timeout is not None:
-                timeout_remaining = timeout - (time.monotonic() - start_time)
+        Each line is yielded as soon as its line ending was received, with
+        ``\\r\\n`` folded into ``\\n``.  Only the current, incomplete line is
+        kept in memory, so this is suitable for commands producing large or
+        never ending output.  When iteration is stopped early, output which
+        was not yet yielded is returned by the next read from the channel.
 
-            c = self.read(1, timeout=timeout_remaining)
-            line.extend(c)
+        **Example**:
 
-            if line.endswith(end):
-                break
+        .. code-block:: python
 
-        return (
-            line.decode("utf-8", errors="replace")
-            .replace("\r\n", "\n")
-            .replace("\n\r", "\n")
-        )
+            ch.sendline("dmesg -w", read_back=True)
+            for line in ch.iter_lines():
+                if "usb 1-1: new" in line:
+                    break
+            ch.sendintr()
+
+        :param bool until_prompt: If ``True``, iteration stops when the
+            prompt which was set using
+            :py:meth:`tbot.machine.channel.Channel.with_prompt` appears.
+            Output preceding the prompt which is not terminated by a line
+            ending is yielded as the last item.  The prompt itself is consumed.
+            The prompt must not contain a line ending.
+        :param None,\\ float timeout: Optional timeout for the whole iteration.
+            If it expires, a :py:exc:`TimeoutError` is raised.
+        """
+        prompt = self.prompt if until_prompt else None
+        if until_prompt and prompt is None:
+            raise Exception("iter_lines(until_prompt=True) needs a prompt")
+
+        normalizer = tbot.log.OutputNormalizer()
+        buf = bytearray()
+        # Offset of the first byte in `buf` which was not yet yielded.  When
+        # the caller stops iterating early, everything after it is pushed back
+        # so it can be read again.
+        pos = 0
+        try:
+            for chunk in self._read_chunks(timeout=timeout):
+                # Only search the new data for line endings, `buf` never
+                # contains a complete line at this point.
+                start = len(buf)
+                buf += chunk
+
+                found_prompt = False
+                if prompt is not None:
+                    span = _find_prompt(buf, prompt)
+                    if span is not None:
+                        self._last_prompt = bytes(buf[span[0] : span[1]])
+                        with memoryview(buf) as view:
+                            self._unread(view[span[1] :])
+                        del buf[span[0] :]
+                        found_prompt = True
+
+                while True:
+                    index = buf.find(b"\n", start) + 1
+                    if index == 0:
+                        break
+                    with memoryview(buf) as view:
+                        line = normalizer.decode(view[pos:index])
+                    pos = start = index
+                    yield line
+
+                if found_prompt:
+                    break
+
+                del buf[:pos]
+                pos = 0
+
+            # Either the prompt was found or the channel was closed.  What is
+            # left is the last line, which has no line ending.
+            with memoryview(buf) as view:
+                line = normalizer.decode(view[pos:], final=True)
+            pos = len(buf)
+            if line != "":
+                yield line
+        finally:
+            with memoryview(buf) as view:
+                self._unread(view[pos:])
 
     def expect(
         self,
@@ -732,7 +1237,9 @@ class Channel(typing.ContextManager):
         ``expect()`` will read ahead in the input stream until one of the
         patterns in ``patterns`` matches or, if not ``None``, the ``timeout``
         expires.  It might read further than the given pattern, if the input
-        contains follow-up bytes in the same chunk of data.
+        contains follow-up bytes in the same chunk of data.  Those bytes are
+        returned as ``after`` but they are also kept in the channel so the
+        next read will still see them.
 
         Different to `pexpect`_, the results are availble as an
         :ref:`channel_expect_result` (:py:class:`~tbot.machine.channel.channel.ExpectResult`)
@@ -750,44 +1257,18 @@ class Channel(typing.ContextManager):
         else:
             pattern_list = [_convert_search_string(pat) for pat in patterns]
 
+        matcher = _PatternMatcher(pattern_list)
         buf = bytearray()
-        for chunk in self.read_iter(timeout=timeout):
-            buf.extend(chunk)
-
-            for pattern_index, pat in enumerate(pattern_list):
-                if isinstance(pat, bytes):
-                    index = buf.find(pat)
-                    if index != -1:
-                        return ExpectResult(
-                            pattern_index,
-                            pat.decode("utf-8", errors="replace"),
-                            buf[:index]
-                            .decode("utf-8", errors="replace")
-                            .replace("\r\n", "\n")
-                            .replace("\n\r", "\n"),
-                            buf[index + len(pat) :]
-                            .decode("utf-8", errors="replace")
-                            .replace("\r\n", "\n")
-                            .replace("\n\r", "\n"),
-                        )
-                elif isinstance(pat, BoundedPattern):
-                    match = pat.pattern.search(buf)
-                    if match is not None:
-                        return ExpectResult(
-                            pattern_index,
-                            match,
-                            buf[: match.span(0)[0]]
-                            .decode("utf-8", errors="replace")
-                            .replace("\r\n", "\n")
-                            .replace("\n\r", "\n"),
-                            buf[match.span(0)[1] :]
-                            .decode("utf-8", errors="replace")
-                            .replace("\r\n", "\n")
-                            .replace("\n\r", "\n"),
-                        )
-                else:
-                    raise AssertionError(
-                        f"expect pattern has unknown type: {pat.__class__!r}"
+        for chunk in self._read_chunks(timeout=timeout):
+            buf += chunk
+
+            result = matcher.search(buf)
+            if result is not None:
+                pattern_index, start, end, match = result
+                with memoryview(buf) as view:
+                    self._unread(view[end:])
+                    return ExpectResult(
+                        pattern_index, match, _decode(view[:start]), _decode(view[end:])
                     )
 
         raise Exception("reached end of stream without pattern appearing")
@@ -866,26 +1347,172 @@ class Channel(typing.ContextManager):
         buf = bytearray()
 
         with ctx:
-            for new in self.read_iter(timeout=timeout):
+            for new in self._read_chunks(timeout=timeout):
                 buf += new
 
-                if isinstance(self.prompt, bytes):
-                    if buf.endswith(self.prompt):
-                        return (
-                            buf[: -len(self.prompt)]
-                            .decode("utf-8", errors="replace")
-                            .replace("\r\n", "\n")
-                            .replace("\n\r", "\n")
-                        )
-                elif isinstance(self.prompt, BoundedPattern):
-                    match = self.prompt.pattern.search(buf)
-                    if match is not None:
-                        return (
-                            buf[: match.span()[0]]
-                            .decode("utf-8", errors="replace")
-                            .replace("\r\n", "\n")
-                            .replace("\n\r", "\n")
-                        )
+                if self.prompt is None:
+                    continue
+
+                span = _find_prompt(buf, self.prompt)
+                if span is not None:
+                    self._last_prompt = bytes(buf[span[0] : span[1]])
+                    with memoryview(buf) as view:
+                        self._unread(view[span[1] :])
+                        return _decode(view[: span[0]])
+
+        raise RuntimeError("unreachable")
+
+    def read_until_prompt_probing(
+        self,
+        probe: typing.Callable[[], None],
+        prompt: typing.Optional[ConvenientSearchString] = None,
+        timeout: typing.Optional[float] = None,
+        *,
+        interval: float = 0.02,
+        max_interval: float = 1.0,
+        initial_probe: bool = True,
+    ) -> ProbeResult:
+        """
+        Repeatedly send a probe until the prompt is detected.
+
+        This is meant for waiting until the other side becomes responsive, for
+        example a shell which is still starting up.  The channel is read
+        continuously and this method returns as soon as the prompt was
+        received.  Probes are sent with an exponential backoff, starting at
+        ``interval`` and doubling up to ``max_interval``.  Below that limit,
+        the interval is never shorter than four times the measured round-trip
+        time of the first probe, so slow channels are not flooded with
+        retries.
+
+        **Example**:
+
+        .. code-block:: python
+
+            ch.read_until_prompt_probing(
+                lambda: ch.sendline("echo TBOT''LOGIN"),
+                prompt="TBOTLOGIN",
+            )
+
+        :param probe: Callable which sends a single probe.
+        :param ConvenientSearchString prompt: The prompt to read up to.  If
+            ``None``, the prompt which was set using
+            :py:meth:`tbot.machine.channel.Channel.with_prompt` is used.
+        :param float timeout: Optional timeout.  If ``timeout`` is set and
+            expires before the prompt was detected, this method raises an
+            exception.
+        :param float interval: Time to wait for the prompt after the first
+            probe.
+        :param float max_interval: Upper limit for the time between probes.
+        :param bool initial_probe: Whether to send the first probe immediately
+            or only after waiting for ``interval`` first.
+        :rtype: ProbeResult
+        """
+        ctx: typing.ContextManager[typing.Any]
+        if prompt is not None:
+            ctx = self.with_prompt(prompt)
+        else:
+            ctx = contextlib.ExitStack()
+
+        buf = bytearray()
+        start_time = time.monotonic()
+        probe_time = start_time
+        probes = 0
+        rtt: typing.Optional[float] = None
+
+        if initial_probe:
+            probe()
+            probes += 1
+
+        with ctx:
+            while True:
+                deadline = probe_time + interval
+                if timeout is not None:
+                    deadline = min(deadline, start_time + timeout)
+
+                try:
+                    for new in self._read_chunks(timeout=deadline - time.monotonic()):
+                        if rtt is None and probes > 0:
+                            rtt = time.monotonic() - probe_time
+                            interval = min(max(interval, 4 * rtt), max_interval)
+                        buf += new
+
+                        if self.prompt is None:
+                            continue
+
+                        span = _find_prompt(buf, self.prompt)
+                        if span is not None:
+                            self._last_prompt = bytes(buf[span[0] : span[1]])
+                            with memoryview(buf) as view:
+                                self._unread(view[span[1] :])
+                                output = _decode(view[: span[0]])
+                            return ProbeResult(
+                                output, time.monotonic() - start_time, probes, rtt
+                            )
+                except TimeoutError:
+                    pass
+
+                if timeout is not None and time.monotonic() - start_time >= timeout:
+                    raise TimeoutError()
+
+                if probes > 0:
+                    interval = min(interval * 2, max_interval)
+                probe()
+                probes += 1
+                probe_time = time.monotonic()
+
+    def read_until_prompt_spooled(
+        self,
+        threshold: int,
+        prompt: typing.Optional[ConvenientSearchString] = None,
+        timeout: typing.Optional[float] = None,
+    ) -> SpooledOutput:
+        """
+        Read until prompt is detected, spooling large output to a file.
+
+        Same as :py:meth:`~tbot.machine.channel.Channel.read_until_prompt` but
+        the output is collected in a
+        :py:class:`~tbot.machine.channel.SpooledOutput`.  Once more than
+        ``threshold`` bytes were received, they are moved to a temporary file
+        instead of being kept in memory.
+
+        :param int threshold: Size in bytes above which the output is moved to
+            a temporary file.
+        :param ConvenientSearchString prompt: The prompt to read up to.
+        :param float timeout: Optional timeout.
+        :rtype: tbot.machine.channel.SpooledOutput
+        """
+        ctx: typing.ContextManager[typing.Any]
+        if prompt is not None:
+            ctx = self.with_prompt(prompt)
+        else:
+            ctx = contextlib.ExitStack()
+
+        out = SpooledOutput(threshold)
+        normalizer = tbot.log.OutputNormalizer()
+        buf = bytearray()
+
+        with ctx:
+            for new in self._read_chunks(timeout=timeout):
+                buf += new
+
+                if self.prompt is None:
+                    continue
+
+                span = _find_prompt(buf, self.prompt)
+                if span is not None:
+                    self._last_prompt = bytes(buf[span[0] : span[1]])
+                    with memoryview(buf) as view:
+                        self._unread(view[span[1] :])
+                        out.write(normalizer.decode(view[: span[0]], final=True))
+                    return out
+
+                # Only the tail can still turn out to be part of the prompt,
+                # everything before it is final.
+                done = len(buf) - len(self.prompt) - 1
+                if done > 0:
+                    with memoryview(buf) as view:
+                        out.write(normalizer.decode(view[:done]))
+                    del buf[:done]
 
         raise RuntimeError("unreachable")
 
@@ -912,20 +1539,45 @@ class Channel(typing.ContextManager):
         buf = bytearray()
 
         try:
-            for new in self.read_iter(timeout=timeout):
+            for new in self._read_chunks(timeout=timeout):
                 buf += new
         except TimeoutError:
             pass
 
-        return (
-            buf.decode("utf-8", errors="replace")
-            .replace("\r\n", "\n")
-            .replace("\n\r", "\n")
-        )
+        return _decode(buf)
 
     # }}}
 
     # borrowing & taking {{{
+    def _transfer(self, placeholder: ChannelIO) -> "Channel":
+        """
+        Move this channel to a new handle.
+
+        The new handle shares the channel-io, the read buffer and all
+        immutable state (compiled patterns, prompt, ...) with this one.  Only
+        the small mutable state is copied and data which was read ahead is
+        moved over.  This handle is left with ``placeholder`` as its
+        channel-io.
+        """
+        cls = self.__class__
+        new = cls.__new__(cls)
+        for klass in cls.__mro__:
+            for slot in getattr(klass, "__slots__", ()):
+                if hasattr(self, slot):
+                    setattr(new, slot, getattr(self, slot))
+        if hasattr(self, "__dict__"):
+            new.__dict__.update(self.__dict__)
+
+        new.death_strings = list(self.death_strings)
+        new._ringbuf = bytearray(self._ringbuf)
+        new._streams = list(self._streams)
+        new._streambuf = bytearray(self._streambuf)
+        new._stream_normalizer = self._stream_normalizer.copy()
+
+        self._readahead = bytearray()
+        self._c = placeholder
+        return new
+
     @contextlib.contextmanager
     def borrow(self) -> "typing.Iterator[Channel]":
         """
@@ -943,15 +1595,17 @@ class Channel(typing.ContextManager):
             chan.sendintr()
         """
         chan_io = self._c
+        new: typing.Optional[Channel] = None
         try:
-            self._c = ChannelBorrowed()
-            new = copy.deepcopy(self)
-            new._c = chan_io
+            new = self._transfer(ChannelBorrowed())
             yield new
 
             # TODO: Maybe don't allow exceptions here?
         finally:
             self._c = chan_io
+            if new is not None:
+                # Data which was read ahead by the borrower is handed back
+                self._readahead = new._readahead
             # Todo mark the `new` channel as no longer accessible
 
     def take(self) -> "Channel":
@@ -963,11 +1617,7 @@ class Channel(typing.ContextManager):
         into a new (irreversible) context.  For example, when a board boots
         from U-Boot to Linux, U-Boot is no longer accessible.
         """
-        chan_io = self._c
-        self._c = ChannelTaken()
-        new = copy.deepcopy(self)
-        new._c = chan_io
-        return new
+        return self._transfer(ChannelTaken())
 
     # }}}
 
@@ -1011,6 +1661,11 @@ class Channel(typing.ContextManager):
             special_chars[termios.VTIME] = b"\0"
             termios.tcsetattr(sys.stdin, termios.TCSAFLUSH, mode)
 
+            if self._readahead != b"":
+                sys.stdout.buffer.write(self._readahead)
+                sys.stdout.buffer.flush()
+                self._readahead = bytearray()
+
             while True:
                 r, _, _ = select.select([self, sys.stdin], [], [])
 
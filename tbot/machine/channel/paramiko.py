@@ -33,12 +33,13 @@ class ParamikoChannelIO(channel.ChannelIO):
         self.ch.invoke_shell()
         self.ch.settimeout(0.0)
 
-    def write(self, buf: bytes) -> int:
+    def write(self, buf: typing.Union[bytes, memoryview]) -> int:
         if self.closed:
             raise channel.ChannelClosedException()
 
         channel._debug_log(self, buf, True)
-        bytes_written = self.ch.send(buf)
+        # paramiko only accepts bytes, not memoryviews
+        bytes_written = self.ch.send(bytes(buf))
         if bytes_written == 0:
             raise channel.ChannelClosedException()
         return bytes_written
@@ -29,6 +29,10 @@ from . import channel
 
 READ_CHUNK_SIZE = 4096
 
+# Time in seconds between checks whether the process is still alive while
+# waiting for it to drain the pty.
+WRITE_POLL_INTERVAL = 0.1
+
 
 class SubprocessChannelIO(channel.ChannelIO):
     __slots__ = ("pty_master", "p")
@@ -48,17 +52,33 @@ class SubprocessChannelIO(channel.ChannelIO):
         flags = flags | os.O_NONBLOCK
         fcntl.fcntl(self.pty_master, fcntl.F_SETFL, flags)
 
-    def write(self, buf: bytes) -> int:
-        if self.closed:
+    def write(self, buf: typing.Union[bytes, memoryview]) -> int:
+        # Don't poll the process here, only check whether it was already seen
+        # exiting.  If it ended in the meantime, the write will fail.
+        if self.p.returncode is not None:
             raise channel.ChannelClosedException()
 
         channel._debug_log(self, buf, True)
-        bytes_written = os.write(self.pty_master, buf)
+        try:
+            while True:
+                try:
+                    bytes_written = os.write(self.pty_master, buf)
+                    break
+                except BlockingIOError:
+                    # The pty's buffer is full.  Wait until the other side
+                    # has read some of it, but stop if it exited instead.
+                    if self.closed:
+                        raise channel.ChannelClosedException
+                    select.select([], [self.pty_master], [], WRITE_POLL_INTERVAL)
+        except OSError:
+            if self.closed:
+                raise channel.ChannelClosedException
+            raise
         if bytes_written == 0:
             raise channel.ChannelClosedException
         return bytes_written
 
-    def read(self, n: int, timeout: typing.Optional[float] = None) -> bytes:
+    def _wait_readable(self, timeout: typing.Optional[float]) -> None:
         if not self.closed:
             # If the process is still running, wait
             # for one byte or the timeout to arrive
@@ -66,11 +86,24 @@ class SubprocessChannelIO(channel.ChannelIO):
             if self.pty_master not in r:
                 raise TimeoutError()
 
+    def read(self, n: int, timeout: typing.Optional[float] = None) -> bytes:
+        self._wait_readable(timeout)
+
         try:
             return channel._debug_log(self, os.read(self.pty_master, n))
         except (BlockingIOError, OSError):
             raise channel.ChannelClosedException
 
+    def readinto(self, buf: memoryview, timeout: typing.Optional[float] = None) -> int:
+        self._wait_readable(timeout)
+
+        try:
+            n = os.readv(self.pty_master, [buf])
+        except (BlockingIOError, OSError):
+            raise channel.ChannelClosedException
+        channel._debug_log(self, buf[:n])
+        return n
+
     def close(self) -> None:
         if self.closed:
             raise channel.ChannelClosedException()
@@ -18,7 +18,7 @@ import typing
 import tbot
 
 from .linux_shell import LinuxShell
-from .path import Path
+from .path import Path, stat_many
 from .special import (
     AndThen,
     Background,
@@ -36,7 +36,15 @@ from .bash import Bash
 from .ash import Ash
 from .build import Builder
 from .lab import Lab
-from .util import RunCommandProxy, CommandEndedException
+from .util import (
+    RunCommandProxy,
+    CommandEndedException,
+    CommandStream,
+    HostFacts,
+    Job,
+    memoize,
+    memoize_host,
+)
 from . import auth
 
 __all__ = (
@@ -60,6 +68,12 @@ __all__ = (
     "Workdir",
     "RunCommandProxy",
     "CommandEndedException",
+    "CommandStream",
+    "HostFacts",
+    "Job",
+    "memoize",
+    "memoize_host",
+    "stat_many",
 )
 
 
@@ -36,7 +36,10 @@ class Ash(linux_shell.LinuxShell):
     def _init_shell(self) -> typing.Iterator:
         try:
             # Wait for shell to appear
-            util.wait_for_shell(self.ch)
+            res = util.wait_for_shell(
+                self.ch, self.probe_interval, self.probe_interval_max
+            )
+            tbot.log_event.shell_ready(self.name, res)
 
             # Set a blacklist of control characters.  These characters are
             # known to mess up the state of the shell.  They are:
@@ -71,30 +74,43 @@ class Ash(linux_shell.LinuxShell):
             # To safeguard the process even further, the prompt is mangled in a
             # way which will be unfolded by the shell.  This will ensure tbot
             # won't accidentally read the prompt back early.
+            #
+            # If the shell supports parameter expansion in PS1, the prompt
+            # also carries the return code of the previous command so it does
+            # not need to be queried separately.
             self.ch.sendline(
                 b"PROMPT_COMMAND=''; PS1='"
-                + TBOT_PROMPT[:6]
+                + util.RETCODE_PS1[:6]
                 + b"''"
-                + TBOT_PROMPT[6:]
+                + util.RETCODE_PS1[6:]
                 + b"'",
                 read_back=True,
             )
-            self.ch.prompt = TBOT_PROMPT
-            self.ch.read_until_prompt()
-
-            # Disable history
-            self.ch.sendline("unset HISTFILE")
-            self.ch.read_until_prompt()
+            self.ch.read_until_prompt(
+                prompt=re.compile(b"TBOT-VEJPVC1QUk9NUFQK-([0-9]{1,3}|\\$\\?)-\\$ ")
+            )
 
-            # Disable line editing
+            # Set up the rest of the shell in a single transmission:
             #
-            # Not really possible on ash.  Instead, make the terminal really
-            # wide and hope for the best ...
-            self.ch.sendline("stty cols 1024")
-            self.ch.read_until_prompt()
-
-            # Set secondary prompt to ""
-            self.ch.sendline("PS2=''")
+            # - Disable history.
+            # - Disable line editing.  Not really possible on ash.  Instead,
+            #   make the terminal really wide and hope for the best ...
+            # - Set secondary prompt to "".
+            setup = b"unset HISTFILE; stty cols 1024; PS2=''"
+            if self.ch._last_prompt == util.RETCODE_PS1:
+                # `$?` was not expanded, fall back to a static prompt
+                setup = (
+                    b"PS1='"
+                    + TBOT_PROMPT[:6]
+                    + b"''"
+                    + TBOT_PROMPT[6:]
+                    + b"'; "
+                    + setup
+                )
+                self.ch.prompt = TBOT_PROMPT
+            else:
+                self.ch.prompt = util.RETCODE_PROMPT
+            self.ch.sendline(setup)
             self.ch.read_until_prompt()
 
             yield None
@@ -130,10 +146,27 @@ class Ash(linux_shell.LinuxShell):
                 out = self.ch.read_until_prompt()
             ev.data["stdout"] = out
 
-            self.ch.sendline("echo $?", read_back=True)
-            retcode = self.ch.read_until_prompt()
+            retcode = util.read_retcode(self.ch)
 
-        return (int(retcode), out)
+        util.invalidate_on_state_change(self, args)
+        return (retcode, out)
+
+    def exec_spooled(
+        self: Self, *args: typing.Union[str, special.Special[Self], path.Path[Self]]
+    ) -> typing.Tuple[int, channel.SpooledOutput]:
+        cmd = self.escape(*args)
+
+        with tbot.log_event.command(self.name, cmd) as ev:
+            ev.retain = False
+            self.ch.sendline(cmd, read_back=True)
+            with self.ch.with_stream(ev, show_prompt=False):
+                out = self.ch.read_until_prompt_spooled(self.spool_threshold)
+            ev.data["stdout"] = out.excerpt()
+
+            retcode = util.read_retcode(self.ch)
+
+        util.invalidate_on_state_change(self, args)
+        return (retcode, out)
 
     def exec0(
         self: Self, *args: typing.Union[str, special.Special[Self], path.Path[Self]]
@@ -150,11 +183,43 @@ class Ash(linux_shell.LinuxShell):
         retcode, _ = self.exec(*args)
         return retcode == 0
 
+    def exec_many(
+        self: Self,
+        commands: typing.Iterable[
+            typing.Sequence[typing.Union[str, special.Special[Self], path.Path[Self]]]
+        ],
+        stop_on_error: bool = False,
+    ) -> typing.List[typing.Tuple[int, str]]:
+        return util.posix_exec_many(self, commands, stop_on_error)
+
+    def map(
+        self: Self,
+        commands: typing.Iterable[
+            typing.Sequence[typing.Union[str, special.Special[Self], path.Path[Self]]]
+        ],
+        workers: int = 4,
+    ) -> typing.List[typing.Tuple[int, str]]:
+        return util.posix_map(self, commands, workers)
+
+    def spawn(
+        self: Self, *args: typing.Union[str, special.Special[Self], path.Path[Self]]
+    ) -> "util.Job[Self]":
+        return util.posix_spawn(self, args, disown=False)
+
     def env(
         self: Self, var: str, value: typing.Union[str, path.Path[Self], None] = None
     ) -> str:
         return util.posix_environment(self, var, value)
 
+    def env_many(
+        self: Self,
+        variables: typing.Union[
+            typing.Mapping[str, typing.Union[str, path.Path[Self]]],
+            typing.Iterable[str],
+        ],
+    ) -> typing.Dict[str, str]:
+        return util.posix_environment_many(self, variables)
+
     @contextlib.contextmanager
     def run(
         self: Self, *args: typing.Union[str, special.Special[Self], path.Path[Self]]
@@ -200,13 +265,29 @@ class Ash(linux_shell.LinuxShell):
                     output = proxy_ch.read_until_prompt()
                 ev.data["stdout"] = ev.getvalue()
 
-            proxy_ch.sendline("echo $?", read_back=True)
-            retcode = int(proxy_ch.read_until_prompt())
+            retcode = util.read_retcode(proxy_ch, from_prompt=not early_exit)
 
+            util.invalidate_on_state_change(self, args)
             return (retcode, output)
 
         yield from util.RunCommandProxy._ctx(self.ch, cmd_context)
 
+    @contextlib.contextmanager
+    def exec_stream(
+        self: Self, *args: typing.Union[str, special.Special[Self], path.Path[Self]]
+    ) -> typing.Iterator[util.CommandStream]:
+        cmd = self.escape(*args)
+
+        with tbot.log_event.command(self.name, cmd) as ev:
+            with self.ch.borrow() as ch:
+                ch.sendline(cmd, read_back=True)
+                stream = util.CommandStream(ch, ev)
+                try:
+                    yield stream
+                finally:
+                    stream._interrupt()
+                    util.invalidate_on_state_change(self, args)
+
     def open_channel(
         self: Self, *args: typing.Union[str, special.Special[Self], path.Path[Self]]
     ) -> channel.Channel:
@@ -236,10 +317,12 @@ class Ash(linux_shell.LinuxShell):
 
         try:
             with self._init_shell():
+                self.invalidate_cache(host_wide=False)
                 yield self
         finally:
             self.ch.sendline("exit")
             self.ch.read_until_prompt()
+            self.invalidate_cache(host_wide=False)
 
     def interactive(self) -> None:
         # Generate the endstring instead of having it as a constant
@@ -272,6 +355,7 @@ class Ash(linux_shell.LinuxShell):
         self.ch.attach_interactive(end_magic=endstr)
 
         tbot.log.message("Exiting interactive shell ...")
+        util.invalidate_on_state_change(self, ())
 
         try:
             self.ch.sendline("exit")
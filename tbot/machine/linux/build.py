@@ -16,9 +16,11 @@
 
 import abc
 import contextlib
+import secrets
 import typing
 
 from . import linux_shell, path
+from .special import Raw
 
 
 class Toolchain(abc.ABC):
@@ -52,17 +54,115 @@ class EnvScriptToolchain(Toolchain):
             }
     """
 
-    def __init__(self, path: path.Path[H]) -> None:
+    def __init__(self, path: path.Path[H], snapshot: bool = True) -> None:
         """
         Create a new EnvScriptToolchain.
 
+        Sourcing the env script can take quite some time.  Unless ``snapshot``
+        is ``False``, the changes it makes to exported environment variables
+        are recorded the first time and replayed when the toolchain is
+        enabled again.  A snapshot is only reused as long as the script and
+        the environment it is sourced in stay the same.  It can also be
+        stored on the build-host, see
+        :py:attr:`Builder.toolchain_cache <tbot.machine.linux.Builder.toolchain_cache>`.
+
         :param linux.Path path: Path to the env script
+        :param bool snapshot: Whether to record and replay the environment set
+            up by the script.  Disable this for scripts which do more than
+            exporting variables, like defining shell functions or aliases.
         """
         self.env_script = path
+        self.snapshot = snapshot
 
     def enable(self, host: H) -> None:
-        host.exec0("unset", "LD_LIBRARY_PATH")
-        host.exec0("source", self.env_script)
+        if not self.snapshot:
+            host.exec0("unset", "LD_LIBRARY_PATH")
+            host.exec0("source", self.env_script)
+            return
+
+        script: path.Path = self.env_script
+        key = _env_key(host, script)
+        cache_file = host.workdir / f".tbot-toolchain-{key}.sh"
+        snapshot = _SNAPSHOTS.get((host.name, key))
+        if snapshot is not None:
+            values, unset = snapshot
+            host.env_many(values)
+            if unset != []:
+                host.exec0("unset", *unset)
+            return
+
+        if host.toolchain_cache and host.test(
+            "test", "-r", cache_file, Raw("&&"), ".", cache_file
+        ):
+            return
+
+        # Dump the exported environment before and after sourcing the script,
+        # each variable prefixed with a random marker.  A last record
+        # terminates each dump so output of the script can't end up in the
+        # value of a variable.
+        marker = f"TBOT{secrets.token_hex(4)}"
+        output = host.exec0(
+            Raw(
+                f"( {_ENV_DUMP.format(marker=marker, kind='b')} )"
+                " && unset LD_LIBRARY_PATH"
+                f" && . {host.escape(script)}"
+                f" && ( {_ENV_DUMP.format(marker=marker, kind='a')} )"
+            )
+        )
+
+        env: typing.Dict[str, typing.Dict[str, str]] = {"b": {}, "a": {}}
+        for record in output.split(marker)[1:]:
+            kind, _, entry = record.partition(" ")
+            var, sep, value = entry[:-1].partition("=")
+            if sep != "" and kind in env and var not in _ENV_IGNORE:
+                env[kind][var] = value
+        before, after = env["b"], env["a"]
+
+        values = {var: v for var, v in after.items() if before.get(var) != v}
+        unset = [var for var in before if var not in after]
+        _SNAPSHOTS[(host.name, key)] = (values, unset)
+
+        if host.toolchain_cache:
+            content = "".join(
+                f"export {var}={host.escape(v)}\n" for var, v in values.items()
+            )
+            if unset != []:
+                content += f"unset {' '.join(unset)}\n"
+            cache_file.write_text(content)
+
+
+# Environment snapshots of EnvScriptToolchains, keyed by (host-name, key)
+_SNAPSHOTS: typing.Dict[
+    typing.Tuple[str, str], typing.Tuple[typing.Dict[str, str], typing.List[str]]
+] = {}
+
+# Variables which are changed by the shell itself
+_ENV_IGNORE = frozenset(["OLDPWD", "PWD", "SHLVL", "_"])
+
+# Prints all exported variables as `<marker><kind> <name>=<value>\n` followed by
+# `<marker><kind>\n`.  bash lists them as `declare -x NAME="value"`, other
+# shells as `export NAME=value`.
+_ENV_DUMP = (
+    "for v in $(export -p | sed -n"
+    " -e 's/^declare -x \\([A-Za-z_][A-Za-z0-9_]*\\)=.*/\\1/p'"
+    " -e 's/^export \\([A-Za-z_][A-Za-z0-9_]*\\)=.*/\\1/p');"
+    ' do eval "x=\\"\\${{$v}}\\""; printf \'{marker}{kind} %s=%s\\n\' "$v" "$x"; done;'
+    " printf '{marker}{kind}\\n'"
+)
+
+
+def _env_key(host: "Builder", script: path.Path) -> str:
+    # Changes to the script or to the environment it is sourced in lead to a
+    # new key.
+    s = host.escape(script)
+    crc, size = host.exec0(
+        Raw(
+            f"{{ echo {s}; stat -c %Y {s}; cksum <{s}; export -p"
+            " | grep -v -E '^(declare -x|export) (OLDPWD|PWD|SHLVL|_)(=|$)'; }"
+            " | cksum"
+        )
+    ).split()
+    return f"{crc}-{size}"
 
 
 class DistroToolchain(Toolchain):
@@ -86,10 +186,11 @@ class DistroToolchain(Toolchain):
         self.prefix = prefix
 
     def enable(self, host: H) -> None:
-        host.env("ARCH", self.arch)
-        host.env("CROSS_COMPILE", self.prefix)
-
-        host.env("CC", self.prefix + "gcc")
+        values = {
+            "ARCH": self.arch,
+            "CROSS_COMPILE": self.prefix,
+            "CC": self.prefix + "gcc",
+        }
         for tool in [
             "objdump",
             "size",
@@ -102,7 +203,8 @@ class DistroToolchain(Toolchain):
             "readelf",
             "strip",
         ]:
-            host.env(tool.upper(), self.prefix + tool)
+            values[tool.upper()] = self.prefix + tool
+        host.env_many(values)
 
 
 class Builder(linux_shell.LinuxShell):
@@ -151,6 +253,14 @@ class Builder(linux_shell.LinuxShell):
         where the shell expansion will do the right thing.
     """
 
+    toolchain_cache: bool = False
+    """
+    Whether environment snapshots of
+    :py:class:`~tbot.machine.linux.build.EnvScriptToolchain` are stored in the
+    workdir of this build-host.  Later runs of tbot can then skip sourcing the
+    env script as well.
+    """
+
     @property
     @abc.abstractmethod
     def toolchains(self) -> typing.Dict[str, Toolchain]:
@@ -15,6 +15,7 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import abc
+import contextlib
 import typing
 import tbot
 import tbot.error
@@ -32,6 +33,159 @@ class LinuxShell(shell.Shell):
     This class defines the common interface for linux shells.
     """
 
+    spool_threshold: int = 1024 * 1024
+    """
+    Size in bytes above which
+    :py:meth:`~tbot.machine.linux.LinuxShell.exec_spooled` moves command
+    output to a temporary file.
+    """
+
+    transfer_window: int = 64 * 1024
+    """
+    Number of bytes of encoded data sent in one go by
+    :py:meth:`Path.write_bytes() <tbot.machine.linux.Path.write_bytes>` before
+    waiting for the remote side to catch up.  Machines on a serial console
+    (:py:class:`~tbot.machine.board.LinuxBootLogin`) use a much smaller
+    window.
+    """
+
+    probe_interval: float = 0.02
+    """
+    Time in seconds to wait for the shell after the first probe during
+    initialization.  Retries back off exponentially from here.  Connectors for
+    slow links can override this.
+    """
+
+    probe_interval_max: float = 1.0
+    """Upper limit for the time in seconds between two probes."""
+
+    query_cache: bool = False
+    """
+    Whether results of queries are cached on this machine.
+
+    Queries decorated with :py:func:`~tbot.machine.linux.memoize` or
+    :py:func:`~tbot.machine.linux.memoize_host`, like reading environment
+    variables with :py:meth:`~tbot.machine.linux.LinuxShell.env`, are then
+    only run once.  The cache is dropped automatically when tbot changes the
+    shell state, but not when a command does so behind tbot's back (for
+    example ``exec0(linux.Raw("cd /tmp && make"))``).  Call
+    :py:meth:`~tbot.machine.linux.LinuxShell.invalidate_cache` in this case.
+    """
+
+    stat_cache_ttl: float = 2.0
+    """
+    Time in seconds for which metadata of paths is cached.
+
+    :py:meth:`Path.stat() <tbot.machine.linux.Path.stat>`,
+    :py:func:`~tbot.machine.linux.stat_many`, and the ``is_*()`` predicates of
+    :py:class:`~tbot.machine.linux.Path` share this cache.  It is dropped
+    whenever tbot runs a command which might change files (anything but a
+    few read-only tools like ``cat`` or ``test``).  Changes made by
+    background jobs or other processes are only noticed once the cached entry
+    expired.  Set to ``0`` to disable the cache.
+    """
+
+    facts_env: typing.Tuple[str, ...] = (
+        "HOME",
+        "USER",
+        "XDG_DATA_HOME",
+        "XDG_RUNTIME_DIR",
+    )
+    """Environment variables collected into :py:attr:`facts`."""
+
+    facts_tools: typing.Tuple[str, ...] = (
+        "base64",
+        "curl",
+        "git",
+        "gzip",
+        "make",
+        "rsync",
+        "sha256sum",
+        "wget",
+    )
+    """
+    Tools which are checked for when collecting :py:attr:`facts`.  Results
+    are used by :py:func:`tbot.tc.shell.check_for_tool`.
+    """
+
+    # Caches which are dropped by invalidate_cache().  They are only created
+    # on an instance once needed, so clones never share them.
+    _facts: typing.Optional[util.HostFacts] = None
+    _query_results: typing.Optional[typing.Dict] = None
+    _query_results_host: typing.Optional[typing.Dict] = None
+    _stats: "typing.Optional[typing.Dict[str, path._Metadata]]" = None
+    _digests: "typing.Optional[typing.Dict[str, path._Digest]]" = None
+    # Whether `stat -c` works, `None` if not known yet (see Path.stat())
+    _has_stat: typing.Optional[bool] = None
+
+    @property
+    def facts(self) -> util.HostFacts:
+        """
+        Snapshot of facts about this machine.
+
+        All facts are collected with a single command on first access.  The
+        snapshot is dropped together with cached query results when tbot
+        changes the shell state (see
+        :py:meth:`~tbot.machine.linux.LinuxShell.invalidate_cache`) and
+        collected again on the next access.
+
+        **Example**:
+
+        .. code-block:: python
+
+            if lnx.facts.machine == "aarch64":
+                ...
+
+            lnx.exec0("make", "-j", str(lnx.facts.nproc or 1))
+        """
+        if self._facts is None:
+            self._facts = util.gather_facts(self)
+        return self._facts
+
+    def _fact_env(self, var: str) -> str:
+        facts = self.facts
+        if var in facts.env:
+            return facts.env[var]
+        return self.env(var)
+
+    def _has_tool(self, tool: str) -> bool:
+        # Facts are only collected for tools which are part of them.  Others
+        # are checked directly, unless the facts happen to be there already.
+        if tool in self.facts_tools or self._facts is not None:
+            has_tool = self.facts.tools.get(tool)
+            if has_tool is not None:
+                return has_tool
+        return self.test("which", tool)
+
+    def _query_cache(self, host_wide: bool) -> typing.Optional[typing.Dict]:
+        if not self.query_cache:
+            return None
+
+        if host_wide:
+            if self._query_results_host is None:
+                self._query_results_host = {}
+            return self._query_results_host
+
+        if self._query_results is None:
+            self._query_results = {}
+        return self._query_results
+
+    def invalidate_cache(self, host_wide: bool = True) -> None:
+        """
+        Drop cached query results, path metadata, and the :py:attr:`facts`
+        snapshot.
+
+        :param bool host_wide: Also drop the results of queries decorated with
+            :py:func:`~tbot.machine.linux.memoize_host`.
+        """
+        self._facts = None
+        self._query_results = None
+        self._stats = None
+        if host_wide:
+            self._query_results_host = None
+            self._digests = None
+            self._has_stat = None
+
     @abc.abstractmethod
     def escape(
         self: Self, *args: typing.Union[str, Special[Self], path.Path[Self]]
@@ -158,6 +312,37 @@ class LinuxShell(shell.Shell):
         """
         raise tbot.error.AbstractMethodError()
 
+    def env_many(
+        self: Self,
+        variables: typing.Union[
+            typing.Mapping[str, typing.Union[str, path.Path[Self]]],
+            typing.Iterable[str],
+        ],
+    ) -> typing.Dict[str, str]:
+        """
+        Get or set many environment variables with a single command.
+
+        **Example**:
+
+        .. code-block:: python
+
+            # Set some variables
+            lnx.env_many({"ARCH": "arm64", "CROSS_COMPILE": "aarch64-linux-gnu-"})
+
+            # Get the values of some variables
+            values = lnx.env_many(["HOME", "PATH"])
+            print(values["PATH"])
+
+        :param variables: Either a mapping from variable names to the values
+            they should be set to or a list of variable names to read.
+        :rtype: dict(str, str)
+        :returns: The current (new) values of the variables.
+        """
+        raise NotImplementedError(
+            f"This shell {self.__class__.__name__} does not"
+            + " support bulk environment access!"
+        )
+
     def run(
         self: Self, *args: typing.Union[str, Special[Self], path.Path[Self]]
     ) -> typing.ContextManager[util.RunCommandProxy]:
@@ -210,6 +395,228 @@ class LinuxShell(shell.Shell):
             + " support running interactive commands!"
         )
 
+    def exec_many(
+        self: Self,
+        commands: typing.Iterable[
+            typing.Sequence[typing.Union[str, Special[Self], path.Path[Self]]]
+        ],
+        stop_on_error: bool = False,
+    ) -> typing.List[typing.Tuple[int, str]]:
+        """
+        Run many commands with a single transmission.
+
+        All commands are sent to the shell at once (in as few command-lines
+        as possible) and their outputs are split apart afterwards.  Compared
+        to calling :py:meth:`~tbot.machine.linux.LinuxShell.exec` for each
+        command, this saves a round-trip per command which matters a lot on
+        slow connections.
+
+        The commands must not be interactive and must not read from stdin.
+
+        **Example**:
+
+        .. code-block:: python
+
+            results = lh.exec_many([
+                ("mkdir", "-p", builddir),
+                ("uname", "-r"),
+                ("test", "-e", builddir / ".config"),
+            ])
+
+            for retcode, output in results:
+                ...
+
+        :param commands: The commands, each as a sequence of arguments like
+            they would be passed to :py:meth:`~tbot.machine.linux.LinuxShell.exec`.
+        :param bool stop_on_error: If ``True``, stop at the first command which
+            fails.  The following commands are not run and no results are
+            returned for them.
+        :rtype: list(tuple(int, str))
+        :returns: A ``(retcode, output)`` tuple for each command which was run.
+        """
+        raise NotImplementedError(
+            f"This shell {self.__class__.__name__} does not"
+            + " support running batches of commands!"
+        )
+
+    @contextlib.contextmanager
+    def batch(
+        self: Self, stop_on_error: bool = False
+    ) -> "typing.Iterator[util.CommandBatch[Self]]":
+        """
+        Collect commands and run them as a batch at the end of the context.
+
+        Context-manager version of
+        :py:meth:`~tbot.machine.linux.LinuxShell.exec_many`.  The results of
+        each command are available once the context was left.
+
+        **Example**:
+
+        .. code-block:: python
+
+            with lh.batch() as b:
+                b.exec("mkdir", "-p", builddir)
+                kver = b.exec("uname", "-r")
+
+            assert kver.retcode == 0
+            tbot.log.message(f"Kernel: {kver.output.strip()}")
+
+        :param bool stop_on_error: If ``True``, stop at the first command which
+            fails.  The results of the following commands stay ``None``.
+        :rtype: tbot.machine.linux.util.CommandBatch
+        """
+        batch: util.CommandBatch[Self] = util.CommandBatch()
+        yield batch
+
+        results = self.exec_many(
+            (cmd.args for cmd in batch.commands), stop_on_error=stop_on_error
+        )
+        for cmd, (retcode, output) in zip(batch.commands, results):
+            cmd.retcode = retcode
+            cmd.output = output
+
+    def exec_spooled(
+        self: Self, *args: typing.Union[str, Special[Self], path.Path[Self]]
+    ) -> typing.Tuple[int, channel.SpooledOutput]:
+        """
+        Run a command whose output might be huge.
+
+        Same as :py:meth:`~tbot.machine.linux.LinuxShell.exec` but the output
+        is returned as a :py:class:`~tbot.machine.channel.SpooledOutput`.
+        Output larger than
+        :py:attr:`~tbot.machine.linux.LinuxShell.spool_threshold` is kept in
+        a temporary file instead of memory and the log only contains its
+        beginning and end.
+
+        **Example**:
+
+        .. code-block:: python
+
+            retcode, out = lh.exec_spooled("find", "/")
+            with out:
+                for line in out:
+                    if line.endswith("/core\n"):
+                        ...
+
+        :rtype: tuple(int, tbot.machine.channel.SpooledOutput)
+        """
+        raise NotImplementedError(
+            f"This shell {self.__class__.__name__} does not"
+            + " support spooling command output!"
+        )
+
+    def exec_stream(
+        self: Self, *args: typing.Union[str, Special[Self], path.Path[Self]]
+    ) -> typing.ContextManager[util.CommandStream]:
+        """
+        Run a command and iterate over its output line by line.
+
+        Different to :py:meth:`~tbot.machine.linux.LinuxShell.exec`, the
+        output is not collected until the command ends.  Instead, each line is
+        made available as soon as it was received.  This is useful for
+        long-running commands where a testcase needs to react to some output
+        or for commands which produce a lot of output.
+
+        Iteration ends when the command exits.  Afterwards, its return code is
+        available as ``retcode``.  When the context is left while the command
+        is still running, it is interrupted with ``CTRL-C``.
+
+        **Example**:
+
+        .. code-block:: python
+
+            with lh.exec_stream("dmesg", "-w") as dmesg:
+                for line in dmesg:
+                    if "usb 1-1: new" in line:
+                        break
+
+            with lh.exec_stream("make", "-C", srcdir) as make:
+                for line in make:
+                    ...
+
+            if make.retcode != 0:
+                raise Exception("build failed")
+
+        :rtype: tbot.machine.linux.util.CommandStream
+        """
+        raise NotImplementedError(
+            f"This shell {self.__class__.__name__} does not"
+            + " support streaming command output!"
+        )
+
+    def map(
+        self: Self,
+        commands: typing.Iterable[
+            typing.Sequence[typing.Union[str, Special[Self], path.Path[Self]]]
+        ],
+        workers: int = 4,
+    ) -> typing.List[typing.Tuple[int, str]]:
+        """
+        Run independent commands concurrently on clones of this machine.
+
+        Up to ``workers`` clones of the machine are opened and each one runs
+        one command at a time.  This is useful for work which can run in
+        parallel, like checksumming many files or probing several devices.
+        The results are returned in the same order as the commands.
+
+        The commands run in fresh shells, so they must not depend on state
+        of this shell like the working directory or environment variables.
+        If the machine cannot be cloned (for example a serial console), the
+        commands are run one after the other on this machine instead.
+
+        **Example**:
+
+        .. code-block:: python
+
+            results = lh.map(
+                [("sha256sum", image) for image in images], workers=8
+            )
+
+            for (retcode, output), image in zip(results, images):
+                ...
+
+        :param commands: The commands, each as a sequence of arguments like
+            they would be passed to :py:meth:`~tbot.machine.linux.LinuxShell.exec`.
+        :param int workers: Maximum number of clones to use.
+        :rtype: list(tuple(int, str))
+        :returns: A ``(retcode, output)`` tuple for each command.
+        """
+        raise NotImplementedError(
+            f"This shell {self.__class__.__name__} does not"
+            + " support running commands concurrently!"
+        )
+
+    def spawn(
+        self: Self, *args: typing.Union[str, Special[Self], path.Path[Self]]
+    ) -> "util.Job[Self]":
+        """
+        Start a command in the background and return a handle for it.
+
+        Unlike :py:data:`linux.Background <tbot.machine.linux.Background>`,
+        the command can be waited for and its return code and output can be
+        retrieved later.  While it is running, the shell can be used for
+        other commands, including more background jobs.  The command's output
+        and bookkeeping files are kept in the machine's
+        :py:attr:`~tbot.machine.linux.LinuxShell.workdir`.
+
+        **Example**:
+
+        .. code-block:: python
+
+            build_a = lh.spawn("make", "-C", srcdir_a)
+            build_b = lh.spawn("make", "-C", srcdir_b)
+
+            for job in (build_a, build_b):
+                if job.wait() != 0:
+                    raise Exception(f"build failed:\n{job.output()}")
+
+        :rtype: tbot.machine.linux.Job
+        """
+        raise NotImplementedError(
+            f"This shell {self.__class__.__name__} does not"
+            + " support background jobs!"
+        )
+
     @abc.abstractmethod
     def open_channel(
         self: Self, *args: typing.Union[str, Special[Self], path.Path[Self]]
@@ -290,7 +697,7 @@ class LinuxShell(shell.Shell):
     @property
     def username(self) -> str:
         """Current username."""
-        return self.env("USER")
+        return self._fact_env("USER")
 
     @property
     def fsroot(self: Self) -> path.Path[Self]:
@@ -15,15 +15,417 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import base64
+import hashlib
+import itertools
 import os
 import errno
 import typing
 import pathlib
-import itertools
-from .. import linux  # noqa: F401
+import secrets
+import time
+import zlib
+from stat import S_ISBLK, S_ISCHR, S_ISDIR, S_ISFIFO, S_ISLNK, S_ISREG, S_ISSOCK
+import tbot
+from .. import linux, channel  # noqa: F401
+from . import util
 
 H = typing.TypeVar("H", bound="linux.LinuxShell")
 
+# Data which can be uploaded using Path.write_bytes():  Anything supporting
+# the buffer protocol (bytes, bytearray, memoryview, mmap, ...) or the path
+# of a local file.
+UploadSource = typing.Union[bytes, bytearray, memoryview, "os.PathLike[str]"]
+
+# Cached metadata of a path:  The time it was collected, the result of
+# `lstat()` and the result of `stat()` (which differs for symlinks).  `None`
+# means the path (or the target of the symlink) does not exist.
+_Metadata = typing.Tuple[
+    float, typing.Optional[os.stat_result], typing.Optional[os.stat_result]
+]
+
+# Record printed by `stat` for each path, following a marker.  The name comes
+# last so it may contain any character.
+_STAT_FORMAT = "%f %i %d %h %u %g %s %X %Y %Z %n"
+
+# Cached digest of a file:  Its stamp (device, inode, size, mtime) and the
+# digest itself.
+_Digest = typing.Tuple[str, str]
+
+# Raw bytes per line of base64 sent during uploads, 1024 characters encoded.
+# This must be a multiple of 3 and stay below the tty's line limit.
+_UPLOAD_LINE = 768
+
+
+def _upload_chunks(source: UploadSource) -> typing.Iterator[bytes]:
+    if isinstance(source, os.PathLike):
+        with open(source, "rb") as f:
+            while True:
+                chunk = f.read(1024 * 1024)
+                if chunk == b"":
+                    break
+                yield chunk
+    else:
+        view = memoryview(source).cast("B")
+        for i in range(0, len(view), 1024 * 1024):
+            yield bytes(view[i : i + 1024 * 1024])
+
+
+def _encoded_lines(chunks: typing.Iterable[bytes]) -> typing.Iterator[bytes]:
+    buf = b""
+    for chunk in chunks:
+        buf += chunk
+        full = len(buf) - len(buf) % _UPLOAD_LINE
+        for i in range(0, full, _UPLOAD_LINE):
+            yield base64.b64encode(buf[i : i + _UPLOAD_LINE])
+        buf = buf[full:]
+    if buf != b"":
+        yield base64.b64encode(buf)
+
+
+def _synced_size(p: "Path[H]", source: UploadSource) -> typing.Optional[int]:
+    # Returns the size of the data if the remote file already contains it.
+    size = 0
+    digest = hashlib.sha256()
+    for chunk in _upload_chunks(source):
+        size += len(chunk)
+        digest.update(chunk)
+
+    try:
+        if p._digest() != (size, digest.hexdigest()):
+            return None
+    except OSError:
+        return None
+
+    tbot.log.message(f"{p} is up to date, saved transferring {size} bytes.")
+    return size
+
+
+def _upload(
+    p: "Path[H]", source: UploadSource, compress: bool, sync: bool = False
+) -> int:
+    host = p.host
+    ch = host.ch
+    compress = compress and host._has_tool("gzip")
+    has_sha256sum = host._has_tool("sha256sum")
+
+    if sync and has_sha256sum:
+        synced = _synced_size(p, source)
+        if synced is not None:
+            return synced
+    p._forget_digest()
+
+    size = 0
+    digest = hashlib.sha256()
+
+    def chunks() -> typing.Iterator[bytes]:
+        nonlocal size
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for chunk in _upload_chunks(source):
+            size += len(chunk)
+            digest.update(chunk)
+            yield compressor.compress(chunk) if compress else chunk
+        if compress:
+            yield compressor.flush()
+
+    # Decompressing on the remote needs the complete stream, so it is
+    # collected in a staging file first.
+    target = p
+    if compress:
+        target = host.workdir / f".tbot-upload-{secrets.token_hex(4)}.gz"
+    dest = host.escape(target)
+
+    # The file is truncated first so errors show up before any data is sent.
+    # Afterwards, echo is disabled:  Each window of data is read by a `head`
+    # whose prompt serves as the acknowledgement for the next window.
+    truncate = f": >{host.escape(p)}"
+    if compress:
+        truncate += f" && : >{dest}"
+    host.exec0(linux.Raw(f"{truncate} && stty -echo"))
+    try:
+        try:
+            window: typing.List[bytes] = []
+            length = 0
+            for line in itertools.chain(_encoded_lines(chunks()), [b""]):
+                if line != b"":
+                    window.append(line)
+                    length += len(line) + 1
+                    if length < host.transfer_window:
+                        continue
+                if window == []:
+                    break
+
+                cmd = f'head -c {length} | base64 -d >>{dest}; echo " $?"'
+                with tbot.log_event.command(host.name, cmd) as ev:
+                    ch.sendline(cmd)
+                    ch.send(b"\n".join(window) + b"\n")
+                    output = ch.read_until_prompt()
+                    ev.data["stdout"] = output
+                if not output.endswith(" 0\n"):
+                    raise Exception(f"failed writing to {p}: {output.strip()}")
+                window = []
+                length = 0
+        except BaseException:
+            # Get rid of a `head` which might still be waiting for data
+            ch.sendintr()
+            ch.read_until_prompt()
+            raise
+        finally:
+            ch.sendline("stty echo")
+            ch.read_until_prompt()
+
+        if compress:
+            host.exec0("gzip", "-dc", target, linux.RedirStdout(p))
+    finally:
+        if compress:
+            host.exec0("rm", "-f", target)
+
+    # Verify the upload
+    if has_sha256sum:
+        remote = host.exec0("sha256sum", linux.Raw("<"), p).split()[0]
+        if remote != digest.hexdigest():
+            raise Exception(f"checksum mismatch after writing {p}")
+    else:
+        remote_size = int(host.exec0("wc", "-c", linux.Raw("<"), p))
+        if remote_size != size:
+            raise Exception(f"size mismatch after writing {p}")
+
+    return size
+
+
+def _download(
+    p: "Path[H]",
+    data_cmd: str,
+    check_cmd: str,
+    chunk_size: int,
+    compress: bool,
+    verify: bool,
+) -> typing.Iterator[bytes]:
+    host = p.host
+    compress = compress and host._has_tool("gzip")
+    has_sha256sum = verify and host._has_tool("sha256sum")
+
+    # The payload is followed by a line with the marker and, if the download
+    # is verified, the checksum (or size) of the data on the remote side.
+    marker = f"TBOT{secrets.token_hex(4)}"
+    cmd = f"{data_cmd} | gzip -c | base64" if compress else f"{data_cmd} | base64"
+    if not verify:
+        check = ""
+    elif has_sha256sum:
+        check = f"$({check_cmd} | sha256sum)"
+    else:
+        check = f"$({check_cmd} | wc -c)"
+    cmd += f"; echo {marker} {check}"
+
+    size = 0
+    digest = hashlib.sha256()
+    decompressor = zlib.decompressobj(31)
+    buf = bytearray()
+    error = None
+    summary = None
+
+    with tbot.log_event.command(host.name, cmd), host.ch.borrow() as ch:
+        ch.sendline(cmd, read_back=True)
+        try:
+            for line in ch.iter_lines(until_prompt=True):
+                if line.startswith(marker):
+                    summary = line[len(marker) :].split()
+                    continue
+                if summary is not None or error is not None:
+                    continue
+
+                try:
+                    data = base64.b64decode(line.rstrip("\n"), validate=True)
+                except ValueError:
+                    # Anything which is not base64 is an error message
+                    error = line.strip()
+                    continue
+                if compress:
+                    data = decompressor.decompress(data)
+                size += len(data)
+                digest.update(data)
+
+                buf += data
+                while len(buf) >= chunk_size:
+                    yield bytes(buf[:chunk_size])
+                    del buf[:chunk_size]
+        except BaseException:
+            # Iteration was stopped early; end the command
+            ch.sendintr()
+            ch.read_until_prompt()
+            raise
+
+    if error is not None or summary is None:
+        raise Exception(f"failed reading {p}: {error}")
+    if verify:
+        if has_sha256sum:
+            if summary[0] != digest.hexdigest():
+                raise Exception(f"checksum mismatch after reading {p}")
+        elif int(summary[0]) != size:
+            raise Exception(f"size mismatch after reading {p}")
+
+    if buf != b"":
+        yield bytes(buf)
+
+
+def _parse_stat(record: str) -> typing.Tuple[str, os.stat_result]:
+    fields = record.split(" ", 10)
+    st = os.stat_result((int(fields[0], 16), *(int(f) for f in fields[1:10])))
+    return (fields[10], st)
+
+
+def _run_stat(
+    host: H, paths: "typing.List[Path[H]]", follow: bool
+) -> typing.Optional[typing.List[typing.Optional[os.stat_result]]]:
+    # Returns `None` if `stat` (with `-c`) is not available on the host.
+    #
+    # Each record is enclosed in markers.  Error messages for paths which do
+    # not exist end up between the records.  stderr is not redirected because
+    # that would make tbot drop the metadata cache.
+    marker = f"TBOT{secrets.token_hex(4)}"
+    flags = ["-L", "-c"] if follow else ["-c"]
+    fmt = marker + _STAT_FORMAT + marker
+    limit = util.BATCH_LINE_LENGTH - len(host.escape("stat", *flags, fmt)) - 1
+
+    output = ""
+    failed = False
+    start = 0
+    for chunk in util.chunk_line((host.escape(p) for p in paths), limit):
+        ec, out = host.exec("stat", *flags, fmt, *paths[start : start + len(chunk)])
+        if ec == 127:
+            host._has_stat = False
+            return None
+        output += out
+        failed = failed or ec != 0
+        start += len(chunk)
+
+    # `stat` prints nothing for paths which do not exist, so the records are
+    # matched up with the paths by their name.
+    records = [_parse_stat(r) for r in output.split(marker)[1::2]]
+    if records != []:
+        host._has_stat = True
+    elif failed and host._has_stat is None:
+        # Either none of the paths exist or this `stat` does not understand
+        # `-c` (e.g. a minimal busybox).  Find out which, once.
+        ec, out = host.exec("stat", "-c", marker + "%n" + marker, "/")
+        host._has_stat = ec == 0 and f"{marker}/{marker}" in out
+        if not host._has_stat:
+            return None
+    results: typing.List[typing.Optional[os.stat_result]] = []
+    i = 0
+    for p in paths:
+        if i < len(records) and records[i][0] == p._local_str():
+            results.append(records[i][1])
+            i += 1
+        else:
+            results.append(None)
+
+    return results
+
+
+def _stat_many(
+    paths: "typing.List[Path[H]]",
+) -> typing.Optional[typing.List[_Metadata]]:
+    if paths == []:
+        return []
+    host = paths[0].host
+    if host._has_stat is False:
+        return None
+
+    lstats = _run_stat(host, paths, follow=False)
+    if lstats is None:
+        return None
+
+    # Symlinks are followed in a second step, only if there are any
+    stats = list(lstats)
+    links = [i for i, st in enumerate(lstats) if st is not None and S_ISLNK(st.st_mode)]
+    if links != []:
+        targets = _run_stat(host, [paths[i] for i in links], follow=True)
+        assert targets is not None
+        for i, st in zip(links, targets):
+            stats[i] = st
+
+    now = time.monotonic()
+    metadata = [(now, lst, st) for lst, st in zip(lstats, stats)]
+    _remember(host, zip(paths, metadata))
+    return metadata
+
+
+def _remember(
+    host: H, entries: "typing.Iterable[typing.Tuple[Path[H], _Metadata]]"
+) -> None:
+    if host.stat_cache_ttl > 0:
+        if host._stats is None:
+            host._stats = {}
+        for p, meta in entries:
+            host._stats[p._local_str()] = meta
+
+
+def _find(
+    p: "Path[H]", *args: str
+) -> "typing.Iterator[typing.Tuple[Path[H], os.stat_result]]":
+    # Streams all entries found by `find` below p, together with their
+    # metadata.  `stat` is used instead of `-printf` which busybox does not
+    # support.  Entries which are not symlinks are added to the metadata cache.
+    host = p.host
+    marker = f"TBOT{secrets.token_hex(4)}"
+    end = f"TBOT{secrets.token_hex(4)}"
+
+    # The trailing slash makes find descend into p if it is a symlink
+    root = host.escape(p)
+    if p._local_str() != "/":
+        root += "/"
+
+    cmd = host.escape(
+        "find",
+        linux.Raw(root),
+        *args,
+        "-exec",
+        "stat",
+        "-c",
+        marker + _STAT_FORMAT + marker,
+        "{}",
+        "+",
+    )
+    cmd += f"; echo {end}$?"
+
+    found = False
+    status = None
+    with tbot.log_event.command(host.name, cmd), host.ch.borrow() as ch:
+        ch.sendline(cmd, read_back=True)
+        try:
+            buf = ""
+            for line in ch.iter_lines(until_prompt=True):
+                if buf == "" and line.startswith(end):
+                    status = int(line[len(end) :])
+                    continue
+                if buf == "" and not line.startswith(marker):
+                    # Error message, for example for unreadable directories
+                    continue
+
+                # A record ends with the second marker.  Names may contain
+                # newlines so it can span multiple lines.
+                buf += line
+                if buf.count(marker) < 2:
+                    continue
+                name, st = _parse_stat(buf.split(marker)[1])
+                buf = ""
+
+                entry = Path(host, name)
+                if not S_ISLNK(st.st_mode):
+                    _remember(host, [(entry, (time.monotonic(), st, st))])
+                found = True
+                yield (entry, st)
+        except BaseException:
+            # Iteration was stopped early; end the command
+            ch.sendintr()
+            ch.read_until_prompt()
+            raise
+
+    # Unreadable subdirectories also make `find` fail; only raise if there
+    # was nothing to list at all.
+    if status != 0 and not found and not p.is_dir():
+        raise OSError(errno.ENOENT, f"Can't list {p}")
+
 
 class Path(pathlib.PurePosixPath, typing.Generic[H]):
     """
@@ -78,60 +480,142 @@ class Path(pathlib.PurePosixPath, typing.Generic[H]):
         Return the result of ``stat`` on this path.
 
         Tries to imitate the results of :meth:`pathlib.Path.stat`, returns a
-        :class:`os.stat_result`.
+        :class:`os.stat_result`.  Symlinks are not followed.
+
+        The result is kept in a short-lived cache which is also used by the
+        ``is_*()`` predicates, see
+        :py:attr:`~tbot.machine.linux.LinuxShell.stat_cache_ttl`.  To query
+        many paths at once, use :py:func:`tbot.machine.linux.stat_many`.
         """
-        ec, stat_str = self.host.exec("stat", "-t", self)
-        if ec != 0:
+        meta = self._metadata()
+        if meta is None:
+            raise Exception(f"{self.host.name} does not have stat")
+        if meta[1] is None:
             raise OSError(errno.ENOENT, f"Can't stat {self}")
+        return meta[1]
+
+    def _metadata(self) -> typing.Optional[_Metadata]:
+        # Returns `None` if `stat` is not available on the host.
+        host = self.host
+        meta = (host._stats or {}).get(self._local_str())
+        if meta is not None and time.monotonic() - meta[0] < host.stat_cache_ttl:
+            return meta
+
+        results = _stat_many([self])
+        return results[0] if results is not None else None
 
-        stat_res = stat_str[len(self._local_str()) + 1 :].split(" ")
-
-        return os.stat_result(
-            (
-                int(stat_res[2], 16),
-                int(stat_res[6]),
-                0,
-                int(stat_res[7]),
-                int(stat_res[3]),
-                int(stat_res[4]),
-                int(stat_res[0]),
-                int(stat_res[10]),
-                int(stat_res[11]),
-                int(stat_res[12]),
+    def _check(
+        self, flag: str, check: typing.Callable[[int], bool], follow: bool = True
+    ) -> bool:
+        meta = self._metadata()
+        if meta is None:
+            return self.host.test("test", flag, self)
+
+        st = meta[2] if follow else meta[1]
+        return st is not None and check(st.st_mode)
+
+    def sha256(self) -> str:
+        """
+        Return the SHA-256 digest of the file this path points to.
+
+        The digest is computed on the remote with ``sha256sum`` and cached
+        together with the device, inode, size, and modification time of the
+        file.  When asked again, a single command checks whether these are
+        still the same and only hashes the file again if they are not.
+
+        **Example**:
+
+        .. code-block:: python
+
+            image = lh.workdir / "u-boot.bin"
+            if image.sha256() != expected:
+                raise Exception(f"{image} is corrupted")
+
+        .. note::
+
+            A change which keeps size and modification time (down to the
+            second) is not noticed.  Files written by tbot are always hashed
+            again.
+
+        :rtype: str
+        :returns: The digest as a hex-string.
+        """
+        return self._digest()[1]
+
+    def _digest(self) -> typing.Tuple[int, str]:
+        host = self.host
+        if not host._has_tool("sha256sum"):
+            raise Exception(f"{host.name} does not have sha256sum")
+
+        if host._digests is None:
+            host._digests = {}
+        cache = host._digests
+        key = self._local_str()
+        stamp, digest = cache.get(key, ("", ""))
+
+        # Size, stamp, and (if the stamp changed) digest are all read with a
+        # single command.  Without `stat`, only the size is sent along and
+        # the digest can't be cached.
+        f = host.escape(self)
+        fallback = f"wc -c <{f} && sha256sum <{f}"
+        if host._has_stat is not False:
+            cmd = (
+                f"if s=$(stat -L -c %d:%i:%s:%Y {f} 2>/dev/null); then echo $s;"
+                f" [ $s = {host.escape(stamp or '-')} ] || sha256sum <{f};"
+                f" else {fallback}; fi"
             )
-        )
+        else:
+            cmd = fallback
+        ec, output = host.exec(linux.special._ReadOnlyRaw(cmd))
+        if ec != 0:
+            cache.pop(key, None)
+            raise OSError(errno.ENOENT, f"Can't hash {self}")
+
+        lines = output.split("\n")
+        if ":" not in lines[0]:
+            cache.pop(key, None)
+            return int(lines[0]), lines[1].split()[0]
+
+        if lines[0] != stamp:
+            stamp, digest = lines[0], lines[1].split()[0]
+            cache[key] = (stamp, digest)
+        return int(stamp.split(":")[2]), digest
+
+    def _forget_digest(self) -> None:
+        if self.host._digests is not None:
+            self.host._digests.pop(self._local_str(), None)
 
     def exists(self) -> bool:
         """Whether this path exists."""
-        return self.host.test("test", "-e", self)
+        return self._check("-e", lambda mode: True)
 
     def is_dir(self) -> bool:
         """Whether this path points to a directory."""
-        return self.host.test("test", "-d", self)
+        return self._check("-d", S_ISDIR)
 
     def is_file(self) -> bool:
         """Whether this path points to a normal file."""
-        return self.host.test("test", "-f", self)
+        return self._check("-f", S_ISREG)
 
     def is_symlink(self) -> bool:
         """Whether this path points to a symlink."""
-        return self.host.test("test", "-h", self)
+        return self._check("-h", S_ISLNK, follow=False)
 
     def is_block_device(self) -> bool:
         """Whether this path points to a block device."""
-        return self.host.test("test", "-b", self)
+        return self._check("-b", S_ISBLK)
 
     def is_char_device(self) -> bool:
         """Whether this path points to a character device."""
-        return self.host.test("test", "-c", self)
+        return self._check("-c", S_ISCHR)
 
     def is_fifo(self) -> bool:
         """Whether this path points to a pipe(fifo)."""
-        return self.host.test("test", "-p", self)
+        return self._check("-p", S_ISFIFO)
 
     def is_socket(self) -> bool:
         """Whether this path points to a unix domain-socket."""
-        return self.host.test("test", "-S", self)
+        return self._check("-S", S_ISSOCK)
 
     @property
     def parent(self) -> "Path[H]":
@@ -167,6 +651,97 @@ class Path(pathlib.PurePosixPath, typing.Generic[H]):
         for line in output[:-1].split("\n"):
             yield Path(self._host, line)
 
+    def iterdir(self) -> "typing.Iterator[Path[H]]":
+        """
+        Iterate over the entries of the directory this path points to.
+
+        All entries are listed with a single ``find`` command and yielded
+        while its output arrives.  Their metadata is added to the cache used
+        by :py:meth:`Path.stat() <tbot.machine.linux.Path.stat>` and the
+        ``is_*()`` predicates, so checking them afterwards needs no further
+        commands.  The machine can't be used until iteration has finished;
+        stopping it early interrupts the command.
+
+        **Example**:
+
+        .. code-block:: python
+
+            for entry in lh.workdir.iterdir():
+                if entry.is_dir():
+                    tbot.log.message(f"Found directory {entry}.")
+        """
+        for entry, _ in _find(self, "-mindepth", "1", "-maxdepth", "1"):
+            yield entry
+
+    def rglob(self, pattern: str) -> "typing.Iterator[Path[H]]":
+        """
+        Iterate over all entries in this subtree whose name matches
+        ``pattern``.
+
+        The pattern is matched by ``find -name`` on the remote side, so it
+        can't contain a ``/``.  Like with
+        :py:meth:`Path.iterdir() <tbot.machine.linux.Path.iterdir>`, the
+        entries are streamed from a single command and their metadata is
+        cached.  Symlinks to directories are not followed.
+
+        **Example**:
+
+        .. code-block:: python
+
+            for dts in (repo / "arch" / "arm").rglob("*.dts"):
+                ...
+
+        :raises ValueError: If ``pattern`` contains a ``/``.  This is checked
+            right away, not when iterating.
+        """
+        if "/" in pattern:
+            raise ValueError(f"Pattern {pattern!r} must not contain `/`")
+
+        return (entry for entry, _ in _find(self, "-mindepth", "1", "-name", pattern))
+
+    def walk(
+        self,
+    ) -> "typing.Iterator[typing.Tuple[Path[H], typing.List[str], typing.List[str]]]":
+        """
+        Walk the directory tree below this path.
+
+        Yields a tuple ``(dirpath, dirnames, filenames)`` for each directory,
+        similar to :py:func:`os.walk`.  The whole tree is listed with a single
+        ``find`` command, so directories are yielded **bottom-up**, once all
+        their entries have arrived, and pruning by modifying ``dirnames`` is
+        not possible.  Symlinks are listed in ``filenames`` and are not
+        followed.  Like with
+        :py:meth:`Path.iterdir() <tbot.machine.linux.Path.iterdir>`, the
+        metadata of all entries is cached.
+
+        **Example**:
+
+        .. code-block:: python
+
+            for dirpath, dirnames, filenames in (repo / "drivers").walk():
+                if "Kconfig" not in filenames:
+                    tbot.log.message(f"{dirpath} has no Kconfig")
+        """
+        # Directories which are still being listed.  find outputs a
+        # directory's subtree right after the directory itself, so the
+        # listing of a directory is complete once an entry outside of it
+        # shows up.
+        stack: "typing.List[typing.Tuple[Path[H], typing.List[str], typing.List[str]]]"
+        stack = [(self, [], [])]
+        for entry, st in _find(self, "-mindepth", "1"):
+            parent = entry.parent
+            while len(stack) > 1 and stack[-1][0] != parent:
+                yield stack.pop()
+
+            if S_ISDIR(st.st_mode):
+                stack[-1][1].append(entry.name)
+                stack.append((entry, [], []))
+            else:
+                stack[-1][2].append(entry.name)
+
+        while stack != []:
+            yield stack.pop()
+
     def write_text(
         self,
         data: str,
@@ -192,38 +767,15 @@ class Path(pathlib.PurePosixPath, typing.Generic[H]):
 
             f.exec0("chmod", "+x", f)
 
-        .. warning::
-
-            This string must contain 'text' in the sense that some control
-            characters are not allowed.  Consult the documentation of
-            :py:meth:`LinuxShell.run() <tbot.machine.linux.LinuxShell.run>` for
-            details.
-
-            Additionally, line-endings might be transformed according to the
-            tty's settings.  This function is not meant for byte-by-byte
-            transfers, but for configuration files or small scripts.  If you
-            want to transfer a blob or a larger file, consider using
-            :py:func:`tbot.tc.shell.copy` or (for small files)
-            :py:meth:`Path.write_bytes() <tbot.machine.linux.Path.write_bytes>`.
+        The text is transferred just like
+        :py:meth:`Path.write_bytes() <tbot.machine.linux.Path.write_bytes>`
+        does it, so line-endings and control characters are kept as they are.
         """
         if not isinstance(data, str):
             raise TypeError(f"data must be str, not {data.__class__.__name__}")
         byte_data = data.encode(encoding or "utf-8", errors or "strict")
 
-        with self.host.run(
-            "tee", self, linux.RedirStdout(self.host.fsroot / "/dev/null")
-        ) as ch:
-            with ch.with_death_string("tee: "):
-                ch.send(byte_data, read_back=True)
-
-                # Send ^D twice if the file does not end with a line ending.  This
-                # is necessary to make `tee` notice the EOF correctly.
-                if not (byte_data == b"" or byte_data[-1:] in [b"\n", b"\r"]):
-                    ch.sendcontrol("D")
-
-                ch.sendcontrol("D")
-                ch.terminate0()
-
+        _upload(self, byte_data, compress=False)
         return len(byte_data)
 
     def read_text(
@@ -246,10 +798,42 @@ class Path(pathlib.PurePosixPath, typing.Generic[H]):
 
         return self.host.exec0("cat", self)
 
-    def write_bytes(self, data: bytes) -> int:
+    def write_bytes(
+        self, data: UploadSource, compress: bool = False, sync: bool = False
+    ) -> int:
         """
         Write binary ``data`` into the file this path points to.
 
+        ``data`` can be ``bytes`` or any other object supporting the buffer
+        protocol (like a :py:class:`memoryview` or :py:class:`mmap.mmap`).  It
+        can also be the path of a local file (like a :py:class:`pathlib.Path`)
+        which is then read piece by piece.
+
+        **Example**:
+
+        .. code-block:: python
+
+            f = lnx.workdir / "image.itb"
+            f.write_bytes(pathlib.Path("build/image.itb"), compress=True)
+
+        The data is sent in large windows of base64 lines with echo disabled
+        on the remote side, so only one round-trip is necessary for each
+        :py:attr:`~tbot.machine.linux.LinuxShell.transfer_window` bytes.  In
+        the end, the checksum of the file is verified (using ``sha256sum`` or,
+        if it is not installed, the file size).
+
+        :param data: Data to write.
+        :param bool compress: Compress the data with gzip for the transfer, if
+            ``gzip`` is installed on the remote.  This is useful for slow
+            connections and compressible data.
+        :param bool sync: Compare the digest of ``data`` with
+            :py:meth:`Path.sha256() <tbot.machine.linux.Path.sha256>` of the
+            remote file first and skip the transfer if they match.  This needs
+            ``sha256sum`` on the remote, otherwise the data is always
+            transferred.
+        :rtype: int
+        :returns: Number of bytes written.
+
         .. note::
 
             This method ensures exact byte-by-byte transfer.  To do so, it
@@ -257,38 +841,24 @@ class Path(pathlib.PurePosixPath, typing.Generic[H]):
             readable.  If you intend to transfer text data, please use
             :py:meth:`Path.write_text() <tbot.machine.linux.Path.write_text>`.
         """
-        if not isinstance(data, bytes):
-            raise TypeError(f"data must be bytes, not {data.__class__.__name__}")
-
-        with self.host.run(
-            *["base64", "-d", "-"],
-            linux.Pipe,
-            "tee",
-            self,
-            linux.RedirStdout(self.host.fsroot / "/dev/null"),
-        ) as ch:
-            with ch.with_death_string("tee: "):
-                # Encode as base64 and split into 76 character lines.  This makes
-                # output more readable and does not affect parsing on the remote
-                # end.
-                encoded = iter(base64.b64encode(data))
-                while True:
-                    chunk = bytes(itertools.islice(encoded, 76))
-
-                    if chunk == b"":
-                        break
-
-                    ch.sendline(chunk, read_back=True)
-
-                ch.sendcontrol("D")
-                ch.terminate0()
-
-        return len(data)
-
-    def read_bytes(self) -> bytes:
+        if not isinstance(data, os.PathLike):
+            try:
+                memoryview(data)
+            except TypeError:
+                raise TypeError(
+                    f"data must be bytes, not {data.__class__.__name__}"
+                ) from None
+
+        return _upload(self, data, compress, sync)
+
+    def read_bytes(self, compress: bool = False, verify: bool = True) -> bytes:
         """
         Read the contents of a file, pointed to by this path.
 
+        The data is transferred like with
+        :py:meth:`Path.iter_bytes() <tbot.machine.linux.Path.iter_bytes>`, see
+        there for the meaning of the parameters.
+
         .. note::
 
             This method ensures exact byte-by-byte transfer.  To do so, it
@@ -296,9 +866,83 @@ class Path(pathlib.PurePosixPath, typing.Generic[H]):
             readable.  If you intend to transfer text data, please use
             :py:meth:`Path.read_text() <tbot.machine.linux.Path.read_text>`.
         """
-        encoded = self.host.exec0("base64", self)
+        data = bytearray()
+        for chunk in self.iter_bytes(compress=compress, verify=verify):
+            data += chunk
+        return bytes(data)
+
+    def iter_bytes(
+        self, chunk_size: int = 64 * 1024, compress: bool = False, verify: bool = True
+    ) -> typing.Iterator[bytes]:
+        """
+        Read the contents of a file piece by piece.
+
+        The file is transferred as a stream of base64 which is decoded while
+        it arrives.  Only the current chunk is kept in memory and the data is
+        not written to the log, so this is suitable for large files.  The
+        shell can't be used until iteration has finished; stopping it early
+        interrupts the transfer.
 
-        return base64.b64decode(encoded)
+        **Example**:
+
+        .. code-block:: python
+
+            with open("core.dump", "wb") as f:
+                for chunk in (lnx.workdir / "core").iter_bytes(compress=True):
+                    f.write(chunk)
+
+        :param int chunk_size: Size of the chunks to yield.  The last one
+            might be smaller.
+        :param bool compress: Compress the data with gzip for the transfer, if
+            ``gzip`` is installed on the remote.
+        :param bool verify: Compare the checksum of the received data with the
+            file on the remote (using ``sha256sum`` or, if it is not installed,
+            the file size).  The exception for a mismatch is raised after the
+            last chunk was received.  The file is read twice for this; disable
+            it for files whose content changes (like in ``/proc``).
+        """
+        cat = f"cat {self.host.escape(self)}"
+        return _download(self, cat, cat, chunk_size, compress, verify)
+
+    def read_range(
+        self,
+        offset: int,
+        length: typing.Optional[int] = None,
+        compress: bool = False,
+        verify: bool = True,
+    ) -> bytes:
+        """
+        Read part of a file.
+
+        Only the requested range is transferred.  See
+        :py:meth:`Path.iter_bytes() <tbot.machine.linux.Path.iter_bytes>` for
+        the meaning of ``compress`` and ``verify``.
+
+        **Example**:
+
+        .. code-block:: python
+
+            # Read the header of an image
+            header = (lnx.workdir / "u-boot.img").read_range(0, 64)
+
+        :param int offset: Offset of the first byte to read.
+        :param int length: Number of bytes to read.  If ``None``, read until
+            the end of the file.
+        :rtype: bytes
+        :returns: The data, which is shorter than ``length`` if the file ends
+            before.
+        """
+        if offset < 0 or (length is not None and length < 0):
+            raise ValueError("offset and length must not be negative")
+
+        range_cmd = f"tail -c +{offset + 1} {self.host.escape(self)}"
+        if length is not None:
+            range_cmd += f" | head -c {length}"
+
+        data = bytearray()
+        for chunk in _download(self, range_cmd, range_cmd, 64 * 1024, compress, verify):
+            data += chunk
+        return bytes(data)
 
     def __truediv__(self, key: typing.Any) -> "Path[H]":
         return Path(self._host, super().__truediv__(key))
@@ -315,3 +959,37 @@ class Path(pathlib.PurePosixPath, typing.Generic[H]):
     # __fspath__ does not make sense for tbot paths as they don't represent
     # a path on the local filesystem.
     __fspath__ = None  # type: ignore
+
+
+def stat_many(
+    paths: "typing.Iterable[Path[H]]",
+) -> typing.List[typing.Optional[os.stat_result]]:
+    """
+    Get metadata of many paths at once.
+
+    All paths must belong to the same host.  They are passed to a single
+    ``stat`` invocation (or a few, if they do not fit one command-line).  The
+    results are stored in the same cache which is used by
+    :py:meth:`Path.stat() <tbot.machine.linux.Path.stat>` and the ``is_*()``
+    predicates, so checking the paths afterwards does not need any more
+    commands:
+
+    .. code-block:: python
+
+        dotconfig = repo / ".config"
+        autoconf = repo / "include" / "autoconf.mk"
+        linux.stat_many([dotconfig, autoconf])
+
+        if not dotconfig.exists() or not autoconf.exists():
+            ...
+
+    :param paths: Paths to query.
+    :rtype: list(os.stat_result or None)
+    :returns: The same as :py:meth:`Path.stat() <tbot.machine.linux.Path.stat>`
+        for each path, or ``None`` if the path does not exist.
+    """
+    paths = list(paths)
+    metadata = _stat_many(paths)
+    if metadata is None:
+        raise Exception(f"{paths[0].host.name} does not have stat")
+    return [meta[1] for meta in metadata]
@@ -42,6 +42,12 @@ class Raw(Special[H]):
         return self.string
 
 
+class _ReadOnlyRaw(Raw[H]):
+    # A raw command-line which tbot knows does not change any files.  Unlike
+    # other raw commands, it keeps the metadata cache of paths.
+    __slots__ = ()
+
+
 class _Stdio(Special[H]):
     __slots__ = ("file",)
 
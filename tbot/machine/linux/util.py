@@ -14,28 +14,146 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import collections
+import collections.abc
+import contextlib
+import functools
 import re
+import secrets
+import shlex
+import time
 import typing
+import tbot
 from tbot.machine import channel, linux
 
 M = typing.TypeVar("M", bound="linux.LinuxShell")
 
+# Maximum length of a command-line sent by posix_exec_many().  The tty only
+# accepts lines of up to 4095 characters in canonical mode; stay well below.
+BATCH_LINE_LENGTH = 2048
+F = typing.TypeVar("F", bound=typing.Callable[..., typing.Any])
+
+# Commands which change the state of the shell itself.  Running one of them
+# drops all cached query results which depend on this state.
+STATEFUL_COMMANDS = frozenset(
+    ["cd", "pushd", "popd", "export", "unset", "source", ".", "alias", "unalias"]
+)
+
+# Commands which do not change any files.  Running any other command, or one
+# of these with a redirection, drops the cached metadata of paths (see
+# Path.stat()).
+READONLY_COMMANDS = frozenset(
+    [
+        "base64",
+        "cat",
+        "echo",
+        "grep",
+        "head",
+        "ls",
+        "printf",
+        "readlink",
+        "realpath",
+        "sha256sum",
+        "stat",
+        "tail",
+        "test",
+        "uname",
+        "wc",
+        "which",
+    ]
+)
+
+
+def _memoize(func: F, host_wide: bool) -> F:
+    @functools.wraps(func)
+    def wrapped(mach: M, *args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+        cache = mach._query_cache(host_wide)
+        if cache is None:
+            return func(mach, *args, **kwargs)
+
+        key: typing.Hashable = (wrapped, args, frozenset(kwargs.items()))
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+        except TypeError:
+            # Unhashable arguments can't be cached
+            return func(mach, *args, **kwargs)
+
+        result = func(mach, *args, **kwargs)
+        cache[key] = result
+        return result
+
+    return typing.cast(F, wrapped)
+
+
+def memoize(func: F) -> F:
+    """
+    Decorate a query on a Linux machine to cache its result.
+
+    The decorated function must take the machine as its first argument and
+    must not have any side effects.  Its result is cached per machine and per
+    arguments, if the machine has
+    :py:attr:`~tbot.machine.linux.LinuxShell.query_cache` enabled.  The cache
+    is dropped whenever the state of the shell changes, for example when
+    setting environment variables, changing the working directory, or
+    entering and leaving a subshell.
+
+    **Example**:
+
+    .. code-block:: python
+
+        @linux.memoize
+        def kernel_version(lnx: linux.LinuxShell) -> str:
+            return lnx.exec0("uname", "-r").strip()
+    """
+    return _memoize(func, False)
+
+
+def memoize_host(func: F) -> F:
+    """
+    Decorate a query on a Linux machine to cache its result.
+
+    Same as :py:func:`~tbot.machine.linux.memoize`, but for queries which do
+    not depend on the state of the shell, like the number of CPU cores.  The
+    result stays cached until
+    :py:meth:`~tbot.machine.linux.LinuxShell.invalidate_cache` is called
+    explicitly.
+    """
+    return _memoize(func, True)
 
-def wait_for_shell(ch: channel.Channel) -> None:
+
+def invalidate_on_state_change(mach: M, args: typing.Sequence[typing.Any]) -> None:
+    if len(args) == 1 and isinstance(args[0], linux.special._ReadOnlyRaw):
+        return
+    command = args[0] if args != () and isinstance(args[0], str) else None
+    if command in STATEFUL_COMMANDS:
+        mach.invalidate_cache(host_wide=False)
+    elif command not in READONLY_COMMANDS or not all(
+        isinstance(arg, (str, linux.Path)) for arg in args
+    ):
+        mach._stats = None
+
+
+def wait_for_shell(
+    ch: channel.Channel, interval: float = 0.02, max_interval: float = 1.0
+) -> channel.channel.ProbeResult:
     # Repeatedly sends `echo TBOT''LOGIN\r`.  At some point, the shell
     # interprets this command and prints out `TBOTLOGIN` because of the
     # quotation-marks being removed.  Once we detect this, this function
     # can return, knowing the shell is now running on the other end.
     #
+    # The first probe is sent immediately and retries back off
+    # exponentially, so fast shells are detected right away while slow
+    # consoles do not get flooded.
+    #
     # Credit to Pavel for this idea!
-    with ch.with_prompt(re.compile(b"TBOTLOGIN.{0,80}", re.DOTALL)):
-        while True:
-            ch.sendline("echo TBOT''LOGIN")
-            try:
-                ch.read_until_prompt(timeout=0.2)
-                break
-            except TimeoutError:
-                pass
+    return ch.read_until_prompt_probing(
+        lambda: ch.sendline("echo TBOT''LOGIN"),
+        prompt=re.compile(b"TBOTLOGIN.{0,80}", re.DOTALL),
+        interval=interval,
+        max_interval=max_interval,
+    )
 
 
 def posix_environment(
@@ -43,18 +161,572 @@ def posix_environment(
 ) -> str:
     if value is not None:
         mach.exec0("export", linux.Raw(f"{mach.escape(var)}={mach.escape(value)}"))
+        mach.invalidate_cache(host_wide=False)
         if isinstance(value, linux.Path):
             return value._local_str()
         else:
             return value
+    elif var in ["!", "$"]:
+        # Special names are not escaped.  `$!` changes with every background
+        # command, so don't cache these.
+        return _posix_env_read(mach, var)
+    else:
+        return _posix_env_read_cached(mach, mach.escape(var))
+
+
+def _posix_env_read(mach: M, var: str) -> str:
+    # Add a space in front of the expanded environment variable to ensure
+    # values like `-E` will not get picked up as parameters by echo.  This
+    # space is then cut away again so calling tests don't notice this trick.
+    return mach.exec0("echo", linux.Raw(f'" ${{{var}}}"'))[1:-1]
+
+
+_posix_env_read_cached = memoize(_posix_env_read)
+
+
+def chunk_line(
+    parts: typing.Iterable[str], limit: int
+) -> typing.Iterator[typing.List[str]]:
+    """Split ``parts`` into groups which fit a line of ``limit`` characters."""
+    chunk: typing.List[str] = []
+    length = 0
+    for part in parts:
+        if chunk != [] and length + len(part) + 1 > limit:
+            yield chunk
+            chunk = []
+            length = 0
+        chunk.append(part)
+        length += len(part) + 1
+    if chunk != []:
+        yield chunk
+
+
+def posix_environment_many(
+    mach: M,
+    variables: "typing.Union[typing.Mapping[str, typing.Union[str, linux.Path[M]]], typing.Iterable[str]]",
+) -> typing.Dict[str, str]:
+    if isinstance(variables, collections.abc.Mapping):
+        values = {
+            var: value._local_str() if isinstance(value, linux.Path) else value
+            for var, value in variables.items()
+        }
+        assignments = (
+            f"{mach.escape(var)}={mach.escape(value)}"
+            for var, value in variables.items()
+        )
+        for chunk in chunk_line(assignments, BATCH_LINE_LENGTH):
+            mach.exec0("export", *(linux.Raw(a) for a in chunk))
+        mach.invalidate_cache(host_wide=False)
+        return values
+
+    names = list(variables)
+
+    # Print all values with a single printf, each one prefixed with a random
+    # marker to split them apart again.  This also protects values like `-E`
+    # from being interpreted as options.
+    marker = f"TBOT{secrets.token_hex(4)}"
+    expansions = (var if var in ["!", "$"] else mach.escape(var) for var in names)
+    results: typing.List[str] = []
+    for chunk in chunk_line((f'"${{{var}}}"' for var in expansions), BATCH_LINE_LENGTH):
+        output = mach.exec0("printf", f"{marker}%s\n", *map(linux.Raw, chunk))
+        results.extend(record[:-1] for record in output.split(marker)[1:])
+
+    return dict(zip(names, results))
+
+
+class HostFacts(typing.NamedTuple):
+    """
+    Snapshot of facts about a machine, see
+    :py:attr:`LinuxShell.facts <tbot.machine.linux.LinuxShell.facts>`.
+    """
+
+    env: typing.Dict[str, str]
+    """
+    Values of the environment variables listed in
+    :py:attr:`~tbot.machine.linux.LinuxShell.facts_env`.  Unset variables
+    are empty strings, just like :py:meth:`~tbot.machine.linux.LinuxShell.env`
+    reports them.
+    """
+
+    sysname: str
+    """Name of the operating system (``uname -s``)."""
+
+    release: str
+    """Kernel release (``uname -r``)."""
+
+    machine: str
+    """Hardware architecture (``uname -m``)."""
+
+    nproc: typing.Optional[int]
+    """Number of processors or ``None`` if it could not be determined."""
+
+    tools: typing.Dict[str, bool]
+    """
+    Whether each tool listed in
+    :py:attr:`~tbot.machine.linux.LinuxShell.facts_tools` is installed.
+    """
+
+    disk_free: typing.Optional[int]
+    """
+    Free space in bytes on the filesystem of the default workdir location
+    (``$XDG_DATA_HOME/tbot``) or ``None`` if it could not be determined.
+    """
+
+
+_ENV_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+def gather_facts(mach: M) -> HostFacts:
+    for var in mach.facts_env:
+        if _ENV_NAME.fullmatch(var) is None:
+            raise ValueError(f"invalid environment variable name {var!r}")
+
+    # All facts are printed by a single command, each record starting on a
+    # new line with a random marker.  This way, values can't be confused with
+    # records, even if they span multiple lines.  The script runs in a
+    # subshell so its variables don't leak into the shell.
+    marker = f"TBOT{secrets.token_hex(4)}"
+    script = [
+        f"printf '{marker}env {var}=%s\\n' \"${{{var}}}\"" for var in mach.facts_env
+    ]
+    for opt, name in [("-s", "sysname"), ("-r", "release"), ("-m", "machine")]:
+        script.append(f"printf '{marker}{name} %s\\n' \"$(uname {opt})\"")
+    script.append(
+        f"printf '{marker}nproc %s\\n'"
+        ' "$(nproc --all 2>/dev/null || getconf _NPROCESSORS_ONLN 2>/dev/null)"'
+    )
+    if mach.facts_tools:
+        script.append(
+            f"for t in {mach.escape(*mach.facts_tools)}; do"
+            ' if which "$t" >/dev/null 2>&1;'
+            f" then printf '{marker}tool %s\\n' \"$t\"; fi; done"
+        )
+    # Find the closest existing parent of the default workdir location.  This
+    # must not rely on `dirname` (missing on stripped down busybox builds) and
+    # ends at `/` for empty or relative locations.
+    script.append(
+        'd="${XDG_DATA_HOME:-$HOME/.local/share}";'
+        ' while [ -n "$d" ] && [ "$d" != / ] && ! test -d "$d";'
+        ' do p="${d%/*}"; if [ "$p" = "$d" ]; then p=; fi; d="$p"; done;'
+        ' if [ -z "$d" ]; then d=/; fi;'
+        f' printf \'{marker}df %s\\n\' "$(df -Pk "$d" 2>/dev/null | tail -n 1)"'
+    )
+    output = mach.exec0(linux.Raw(f"( {'; '.join(script)} )"))
+
+    env = {}
+    values = {}
+    tools = {tool: False for tool in mach.facts_tools}
+    for record in output.split(marker)[1:]:
+        key, _, value = record[:-1].partition(" ")
+        if key == "env":
+            var, _, value = value.partition("=")
+            env[var] = value
+        elif key == "tool":
+            tools[value] = True
+        else:
+            values[key] = value
+
+    nproc: typing.Optional[int] = None
+    if values.get("nproc", "").isdigit():
+        nproc = int(values["nproc"])
+
+    disk_free: typing.Optional[int] = None
+    df = values.get("df", "").split()
+    if len(df) >= 4 and df[3].isdigit():
+        disk_free = int(df[3]) * 1024
+
+    return HostFacts(
+        env=env,
+        sysname=values.get("sysname", ""),
+        release=values.get("release", ""),
+        machine=values.get("machine", ""),
+        nproc=nproc,
+        tools=tools,
+        disk_free=disk_free,
+    )
+
+
+ArgTypes = typing.Union[str, "linux.special.Special[M]", "linux.Path[M]"]
+
+
+def _batch_part(cmd: str, index: int, marker: str, stop_on_error: bool) -> str:
+    # A command which is sent to the background ends with `&` which must not
+    # be followed by a `;`.
+    end = " }" if cmd.endswith("&") else "; }"
+    if stop_on_error:
+        return (
+            f"{{ {{ {cmd}{end} && echo {marker}-{index}-0"
+            f" || {{ echo {marker}-{index}-$?; false; }}; }}"
+        )
     else:
-        # Escape environment variable name, unless it is one of a few special names
-        if var not in ["!", "$"]:
-            var = mach.escape(var)
-        # Add a space in front of the expanded environment variable to ensure
-        # values like `-E` will not get picked up as parameters by echo.  This
-        # space is then cut away again so calling tests don't notice this trick.
-        return mach.exec0("echo", linux.Raw(f'" ${{{var}}}"'))[1:-1]
+        return f"{{ {cmd}{end}; echo {marker}-{index}-$?"
+
+
+def posix_exec_many(
+    mach: M,
+    commands: "typing.Iterable[typing.Sequence[ArgTypes[M]]]",
+    stop_on_error: bool = False,
+) -> typing.List[typing.Tuple[int, str]]:
+    commands = list(commands)
+
+    if tbot.log.INTERACTIVE:
+        # Each command needs to be confirmed by the user before it runs.
+        results = []
+        for args in commands:
+            retcode, output = mach.exec(*args)
+            results.append((retcode, output))
+            if stop_on_error and retcode != 0:
+                break
+        return results
+
+    cmds = [mach.escape(*args) for args in commands]
+    for args in commands:
+        invalidate_on_state_change(mach, args)
+
+    # Each command is followed by a marker which contains its index and return
+    # code.  The quotes keep the echoed command-line from matching.
+    token = secrets.token_hex(4)
+    marker = f"TBOT''BATCH{token}"
+    pattern = re.compile(f"TBOTBATCH{token}-([0-9]+)-([0-9]{{1,3}})\n")
+    joiner = " && " if stop_on_error else "; "
+
+    results = []
+    i = 0
+    while i < len(cmds):
+        line = _batch_part(cmds[i], i, marker, stop_on_error)
+        i += 1
+        while i < len(cmds):
+            part = _batch_part(cmds[i], i, marker, stop_on_error)
+            if len(line) + len(joiner) + len(part) > BATCH_LINE_LENGTH:
+                break
+            line += joiner + part
+            i += 1
+
+        mach.ch.sendline(line, read_back=True)
+        out = mach.ch.read_until_prompt()
+
+        start = 0
+        for match in pattern.finditer(out):
+            index = int(match.group(1))
+            assert index == len(results), f"batch marker {index} out of order"
+            output = out[start : match.start()]
+            start = match.end()
+
+            with tbot.log_event.command(mach.name, cmds[index]) as ev:
+                ev.write(output)
+                ev.data["stdout"] = output
+            results.append((int(match.group(2)), output))
+
+        if len(results) < i:
+            # The batch stopped at a failing command
+            break
+
+    return results
+
+
+class BatchedCommand:
+    """
+    A command in a batch created with
+    :py:meth:`LinuxShell.batch() <tbot.machine.linux.LinuxShell.batch>`.
+
+    Its results are available once the batch context was left.
+    """
+
+    __slots__ = ("args", "retcode", "output")
+
+    def __init__(self, args: typing.Sequence[typing.Any]) -> None:
+        self.args = args
+
+        self.retcode: typing.Optional[int] = None
+        """Return code of the command or ``None`` if it was not run."""
+
+        self.output: typing.Optional[str] = None
+        """Output of the command or ``None`` if it was not run."""
+
+
+class CommandBatch(typing.Generic[M]):
+    """
+    Collects commands for
+    :py:meth:`LinuxShell.batch() <tbot.machine.linux.LinuxShell.batch>`.
+    """
+
+    __slots__ = ("commands",)
+
+    def __init__(self) -> None:
+        self.commands: typing.List[BatchedCommand] = []
+
+    def exec(self, *args: "ArgTypes[M]") -> BatchedCommand:
+        """
+        Add a command to the batch.
+
+        :returns: A handle to retrieve the command's results after the batch
+            was run.
+        """
+        cmd = BatchedCommand(args)
+        self.commands.append(cmd)
+        return cmd
+
+
+def posix_map(
+    mach: M, commands: "typing.Iterable[typing.Sequence[ArgTypes[M]]]", workers: int
+) -> typing.List[typing.Tuple[int, str]]:
+    # Escape using the original machine; the clones are the same kind of
+    # shell and paths are valid on all clones.
+    commands = list(commands)
+    cmds = [mach.escape(*args) for args in commands]
+
+    # The clones work on the same files as the original machine
+    for args in commands:
+        invalidate_on_state_change(mach, args)
+
+    clone = getattr(mach, "clone", None)
+    if tbot.log.INTERACTIVE or clone is None or workers < 2 or len(cmds) < 2:
+        return [mach.exec(linux.Raw(cmd)) for cmd in cmds]
+
+    results: typing.List[typing.Tuple[int, str]] = []
+    with contextlib.ExitStack() as cx:
+        pool: typing.List[M] = []
+        for _ in range(min(workers, len(cmds))):
+            try:
+                pool.append(cx.enter_context(clone()))
+            except NotImplementedError:
+                break
+        if pool == []:
+            return [mach.exec(linux.Raw(cmd)) for cmd in cmds]
+
+        # Each clone runs one command at a time.  Results are collected in
+        # order and the clone whose result was just collected gets the next
+        # command.  This needs no threads because the commands run on the
+        # remote side while tbot is waiting for an earlier one.
+        running: typing.Deque[M] = collections.deque()
+        for w, cmd in zip(pool, cmds):
+            w.ch.sendline(cmd, read_back=True)
+            running.append(w)
+
+        for i, cmd in enumerate(cmds):
+            w = running.popleft()
+            out = w.ch.read_until_prompt()
+            retcode = read_retcode(w.ch)
+
+            with tbot.log_event.command(w.name, cmd) as ev:
+                ev.write(out)
+                ev.data["stdout"] = out
+            results.append((retcode, out))
+
+            if i + len(pool) < len(cmds):
+                w.ch.sendline(cmds[i + len(pool)], read_back=True)
+                running.append(w)
+
+    return results
+
+
+def posix_spawn(
+    mach: M, args: "typing.Sequence[ArgTypes[M]]", disown: bool
+) -> "Job[M]":
+    cmd = mach.escape(*args)
+    job: Job[M] = Job(mach, mach.workdir / f"tbot-job-{secrets.token_hex(4)}")
+
+    out = shlex.quote(job._out._local_str())
+    pid = shlex.quote(job._pid._local_str())
+    rc = shlex.quote(job._rc._local_str())
+
+    # The wrapper starts the command in the background, waits for it and
+    # records its return code.  The return code file is written under a
+    # temporary name first, so its existence means the command has ended.
+    # With job control enabled, the command gets its own process group which
+    # allows signalling all of its processes at once.
+    #
+    # The wrapper must not stay in the job table of the interactive shell.
+    # Otherwise the shell would print a completion notice in the middle of
+    # some later command's output.  Shells which have `disown` can simply
+    # forget about it.  For all others, the wrapper is started from a
+    # subshell which leaves it orphaned (and reaped by init).
+    wrapper = (
+        f"set -m; ( {cmd} ) </dev/null >{out} 2>&1 & echo $! >{pid}.tmp;"
+        f" mv {pid}.tmp {pid}; wait $!;"
+        f" echo $? >{rc}.tmp; mv {rc}.tmp {rc}"
+    )
+    wrapper = f"{{ {wrapper}; }} </dev/null >/dev/null 2>&1 &"
+    if disown:
+        mach.exec0(linux.Raw(f"{wrapper} disown $!"))
+    else:
+        mach.exec0(linux.Raw(f"( {wrapper} )"))
+
+    return job
+
+
+class Job(typing.Generic[M]):
+    """
+    Handle for a command started with
+    :py:meth:`LinuxShell.spawn() <tbot.machine.linux.LinuxShell.spawn>`.
+
+    The command runs in the background while the shell can be used for
+    other things.  Its output is written to a file in the machine's workdir
+    and can be retrieved at any time with :py:meth:`~Job.output`.
+
+    **Example**:
+
+    .. code-block:: python
+
+        server = bh.spawn("iperf3", "-s", "-1")
+        lh.exec0("iperf3", "-c", board_ip)
+
+        assert server.wait(timeout=10) == 0
+        tbot.log.message(server.output())
+    """
+
+    __slots__ = ("_mach", "_out", "_pid", "_rc", "retcode")
+
+    # Time in seconds between checks for the return code file.  The time is
+    # doubled after each check, up to the maximum.  The waiting happens on
+    # tbot's side because `sleep` on small targets only takes whole seconds.
+    _POLL_INTERVAL = 0.05
+    _POLL_INTERVAL_MAX = 1.0
+
+    def __init__(self, mach: M, base: "linux.Path[M]") -> None:
+        self._mach = mach
+        self._out = base.parent / f"{base.name}.out"
+        self._pid = base.parent / f"{base.name}.pid"
+        self._rc = base.parent / f"{base.name}.rc"
+
+        self.retcode: typing.Optional[int] = None
+        """Return code of the command or ``None`` if it did not end yet."""
+
+    def _collect(self) -> bool:
+        # The pid and return code files are not needed anymore once the
+        # return code was read.
+        rc = shlex.quote(self._rc._local_str())
+        pid = shlex.quote(self._pid._local_str())
+        retcode, out = self._mach.exec(
+            linux.Raw(f"( cat {rc} && rm -f {pid} {rc} ) 2>/dev/null")
+        )
+        if retcode == 0:
+            self.retcode = int(out)
+            # The command might have changed files while it was running
+            self._mach._stats = None
+        return self.retcode is not None
+
+    def done(self) -> bool:
+        """Check whether the command has ended without waiting for it."""
+        if self.retcode is not None:
+            return True
+        return self._collect()
+
+    def wait(self, timeout: typing.Optional[float] = None) -> int:
+        """
+        Wait for the command to end.
+
+        tbot checks for the return code repeatedly, starting with short
+        intervals which grow up to one second for long-running commands.
+
+        :param float timeout: Optional timeout in seconds.  If the command
+            did not end before it expired, ``wait()`` raises an exception.
+        :rtype: int
+        :returns: The return code of the command.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        interval = self._POLL_INTERVAL
+        while not self.done():
+            delay = interval
+            if deadline is not None:
+                delay = min(delay, deadline - time.monotonic())
+                if delay <= 0:
+                    raise TimeoutError(f"job did not end in time ({timeout}s)")
+            time.sleep(delay)
+            interval = min(interval * 2, self._POLL_INTERVAL_MAX)
+
+        assert self.retcode is not None
+        return self.retcode
+
+    def output(self) -> str:
+        """
+        Get the output of the command.
+
+        stdout and stderr are both contained.  If the command is still
+        running, this is the output up to now.
+        """
+        return self._mach.exec0("cat", self._out)
+
+    def kill(self, signal: str = "TERM") -> None:
+        """
+        Send a signal to the command.
+
+        Nothing happens if the command has already ended.
+
+        :param str signal: Name of the signal, without the ``SIG`` prefix.
+        """
+        if self.retcode is not None:
+            return
+
+        rc = shlex.quote(self._rc._local_str())
+        pid = shlex.quote(self._pid._local_str())
+        # Signal the command's process group or, if the shell could not
+        # create one, just the command's process.  The wrapper might not have
+        # written the pid file yet if the job was only just spawned, so this
+        # is retried for a few seconds.
+        cmd: linux.Raw[M] = linux.Raw(
+            f"( test -e {rc} && exit 0; p=$(cat {pid} 2>/dev/null);"
+            f' test -n "$p" || exit 2;'
+            f" kill -{signal} -- -$p 2>/dev/null || kill -{signal} $p 2>/dev/null )"
+        )
+        deadline = time.monotonic() + 5
+        interval = self._POLL_INTERVAL
+        while True:
+            retcode, _ = self._mach.exec(cmd)
+            if retcode != 2 or time.monotonic() >= deadline:
+                break
+            time.sleep(interval)
+            interval = min(interval * 2, self._POLL_INTERVAL_MAX)
+        if retcode == 0:
+            return
+
+        # The command might have ended between the check and `kill`.  Its
+        # wrapper then writes the return code right away.
+        try:
+            self.wait(timeout=1)
+        except TimeoutError:
+            if retcode == 2:
+                raise Exception(f"job was never started ({self._pid} is missing)")
+            raise Exception(f"failed sending SIG{signal} to job") from None
+
+    def cleanup(self) -> None:
+        """
+        Remove the files of this job from the workdir.
+
+        The output is not available anymore afterwards.  Call this once the
+        command has ended.
+        """
+        self._mach.exec0("rm", "-f", self._out, self._pid, self._rc)
+
+
+# Prompt which carries the return code of the previous command.  The shell
+# expands `$?` in PS1 each time it prints the prompt, so the return code can be
+# read from the prompt tbot is waiting for anyway, instead of asking for it
+# with an additional `echo $?`.
+RETCODE_PS1 = b"TBOT-VEJPVC1QUk9NUFQK-$?-$ "
+RETCODE_PROMPT = channel.BoundedPattern(
+    re.compile(b"TBOT-VEJPVC1QUk9NUFQK-([0-9]{1,3})-\\$ $")
+)
+
+
+def read_retcode(ch: channel.Channel, from_prompt: bool = True) -> int:
+    """
+    Get the return code of the command whose prompt was just read.
+
+    If the prompt carries the return code (see ``RETCODE_PROMPT``), it is taken
+    from there.  Otherwise, it is queried with ``echo $?``.
+
+    :param bool from_prompt: Whether the prompt was read using
+        ``read_until_prompt()``.  If it was consumed in some other way, the
+        return code is always queried.
+    """
+    if from_prompt and ch._last_prompt is not None:
+        match = RETCODE_PROMPT.pattern.fullmatch(ch._last_prompt)
+        if match is not None:
+            return int(match.group(1))
+
+    ch.sendline("echo $?", read_back=True)
+    return int(ch.read_until_prompt())
 
 
 # Type alias for the command context function/generator.  This function needs
@@ -114,7 +786,6 @@ class RunCommandProxy(channel.Channel):
     always call one of them before leaving the context-manager!**  These methods are:
     """
 
-    _write_blacklist: typing.List[int]
     _c: channel.ChannelIO
     _c2: channel.ChannelIO
 
@@ -235,3 +906,83 @@ class CommandEndedException(
 
 class CommandEndedChannel(channel.channel.ChannelTaken):
     exception = CommandEndedException
+
+
+class CommandStream:
+    """
+    Line-by-line output of a command started with
+    :py:meth:`LinuxShell.exec_stream() <tbot.machine.linux.LinuxShell.exec_stream>`.
+
+    Iterating over a ``CommandStream`` yields each line of the command's
+    output as soon as it was received.  Once the command has ended and all
+    lines were consumed, its return code is available as
+    :py:attr:`~CommandStream.retcode`.
+
+    **Example**:
+
+    .. code-block:: python
+
+        with lh.exec_stream("make", "-C", srcdir) as make:
+            for line in make:
+                if "error:" in line:
+                    tbot.log.message(f"Compiler error: {line}")
+
+        assert make.retcode == 0
+    """
+
+    __slots__ = ("_ch", "_ev", "_cx", "_lines", "retcode")
+
+    def __init__(self, ch: channel.Channel, ev: tbot.log.EventIO) -> None:
+        self._ch = ch
+        self._ev = ev
+        self._cx = contextlib.ExitStack()
+        self._cx.enter_context(ch.with_stream(ev, show_prompt=False))
+        self._lines = ch.iter_lines(until_prompt=True)
+
+        self.retcode: typing.Optional[int] = None
+        """
+        Return code of the command or ``None`` if it is still running.
+
+        If the command was interrupted by leaving the context early, this is
+        the return code after sending ``CTRL-C``.
+        """
+
+    def __iter__(self) -> "CommandStream":
+        return self
+
+    def __next__(self) -> str:
+        if self.retcode is not None:
+            raise StopIteration
+
+        try:
+            return next(self._lines)
+        except StopIteration:
+            self._end()
+            raise
+
+    def _end(self) -> None:
+        self._cx.close()
+        self._ev.data["stdout"] = self._ev.getvalue()
+
+        self.retcode = read_retcode(self._ch)
+
+    def _interrupt(self) -> None:
+        """Stop the command if it is still running and resynchronize."""
+        if self.retcode is not None:
+            return
+
+        self._lines.close()
+        self._cx.close()
+        self._ev.data["stdout"] = self._ev.getvalue()
+
+        # The command might have ended (and a prompt might have been sent)
+        # already, so counting prompts is not reliable.  Instead, wait for a
+        # marker which only appears once the shell is ready again.  The quotes
+        # keep the echoed command-line from matching.
+        self._ch.sendintr()
+        self._ch.sendline("echo TBOT''STREAM''END$?")
+        res = self._ch.expect(re.compile(b"TBOTSTREAMEND([0-9]{1,3})\r?\n"))
+        self._ch.read_until_prompt()
+
+        assert isinstance(res.match, typing.Match)
+        self.retcode = int(res.match.group(1))
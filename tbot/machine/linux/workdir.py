@@ -63,14 +63,15 @@ class Workdir(path.Path[H]):
                 # Use ~/tbot-foo-dir
                 workdir = linux.Workdir.athome(lh, "tbot-foo-dir")
 
-        tbot will query the ``$HOME`` environment variable for the location of
-        the current users home directory.
+        tbot will use the ``$HOME`` environment variable from
+        :py:attr:`LinuxShell.facts <tbot.machine.linux.LinuxShell.facts>` for
+        the location of the current users home directory.
         """
         key = (host, subdir)
         try:
             return typing.cast(Workdir, path.Path(host, Workdir._workdirs[key]))
         except KeyError:
-            home = host.env("HOME")
+            home = host._fact_env("HOME")
             p = typing.cast(Workdir, path.Path(host, home) / subdir)
             host.exec0("mkdir", "-p", p)
             Workdir._workdirs[key] = p
@@ -95,14 +96,16 @@ class Workdir(path.Path[H]):
         except KeyError:
             xdg_data_dir = None
             try:
-                res = host.env("XDG_DATA_HOME")
+                res = host._fact_env("XDG_DATA_HOME")
                 if res != "":
                     xdg_data_dir = path.Path(host, res)
             except Exception:
                 pass
 
             if xdg_data_dir is None:
-                xdg_data_dir = path.Path(host, host.env("HOME")) / ".local" / "share"
+                xdg_data_dir = (
+                    path.Path(host, host._fact_env("HOME")) / ".local" / "share"
+                )
 
             p = typing.cast(Workdir, path.Path(host, xdg_data_dir) / "tbot" / subdir)
             host.exec0("mkdir", "-p", p)
@@ -134,7 +137,7 @@ class Workdir(path.Path[H]):
         except KeyError:
             xdg_runtime_dir = None
             try:
-                res = host.env("XDG_RUNTIME_DIR")
+                res = host._fact_env("XDG_RUNTIME_DIR")
                 if res != "":
                     xdg_runtime_dir = path.Path(host, res)
             except Exception:
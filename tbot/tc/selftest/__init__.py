@@ -86,9 +86,21 @@ def selftest(lab: None = None) -> None:
             machine.selftest_machine_labhost_shell,
             machine.selftest_machine_ssh_shell,
             machine.selftest_machine_sshlab_shell,
+            machine.selftest_machine_channel_matching,
+            machine.selftest_machine_channel_readahead,
+            machine.selftest_machine_channel_death_strings,
+            machine.selftest_machine_channel_unicode,
+            machine.selftest_machine_channel_prompt_holdback,
+            machine.selftest_machine_channel_iter_lines,
+            machine.selftest_machine_channel_probing,
+            machine.selftest_machine_shell_init,
+            machine.selftest_machine_map,
+            machine.selftest_machine_query_cache,
+            machine.selftest_machine_facts,
             path.selftest_path_stat,
             path.selftest_path_integrity,
             path.selftest_path_files,
+            path.selftest_path_listing,
             board_machine.selftest_board_power,
             board_machine.selftest_board_uboot,
             board_machine.selftest_board_uboot_noab,
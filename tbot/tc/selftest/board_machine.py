@@ -42,9 +42,17 @@ PS1='Test-U-Boot> '
 alias version="uname -a"
 function printenv() {
     if [ $# = 0 ]; then
-        set | grep -E '^U'
+        set | grep -E '^(U|TBOT)' | sed "s/'//g"
     else
-        set | grep "$1" | sed "s/'//g"
+        local ret=0
+        for var; do
+            if [ -n "${!var+x}" ]; then
+                set | grep "^$var=" | sed "s/'//g"
+            else
+                echo "## Error: \\"$var\\" not defined"; ret=1
+            fi
+        done
+        return $ret
     fi
 }
 function setenv() { local var="$1"; shift; eval "$var=\\"$*\\""
@@ -68,9 +76,17 @@ unset HISTFILE
 alias version="uname -a"
 function printenv() {
     if [ $# = 0 ]; then
-        set | grep -E '^U'
+        set | grep -E '^(U|TBOT)' | sed "s/'//g"
     else
-        set | grep "$1" | sed "s/'//g"
+        local ret=0
+        for var; do
+            if [ -n "${!var+x}" ]; then
+                set | grep "^$var=" | sed "s/'//g"
+            else
+                echo "## Error: \\"$var\\" not defined"; ret=1
+            fi
+        done
+        return $ret
     fi
 }
 function setenv() { local var="$1"; shift; eval "$var=\\"$*\\""
@@ -29,6 +29,17 @@ __all__ = (
     "selftest_machine_ssh_shell",
     "selftest_machine_sshlab_shell",
     "selftest_machine_channel",
+    "selftest_machine_channel_matching",
+    "selftest_machine_channel_readahead",
+    "selftest_machine_channel_death_strings",
+    "selftest_machine_channel_unicode",
+    "selftest_machine_channel_prompt_holdback",
+    "selftest_machine_channel_iter_lines",
+    "selftest_machine_channel_probing",
+    "selftest_machine_shell_init",
+    "selftest_machine_map",
+    "selftest_machine_query_cache",
+    "selftest_machine_facts",
 )
 
 
@@ -100,6 +111,544 @@ def selftest_machine_sshlab_shell(
                 selftest_machine_shell(sls)
 
 
+@tbot.testcase
+def selftest_machine_channel_matching(
+    lab: typing.Optional[selftest.SelftestHost] = None,
+) -> None:
+    """Test pattern matching on channels with a lot of output."""
+    with lab or selftest.SelftestHost() as lh:
+        tbot.log.message("Testing expect() ...")
+        with lh.run("seq", "1", "100000") as seq:
+            res = seq.expect(["123456", tbot.Re(r"\r\n(5000\d)\r"), "50001"])
+            assert res.i == 1, repr(res.i)
+            assert isinstance(res.match, typing.Match), "Not a match object"
+            assert res.match.group(1) == b"50000", repr(res.match)
+            assert res.before.endswith("\n49998\n49999"), repr(res.before[-20:])
+            seq.terminate0()
+
+        tbot.log.message("Testing read_until_prompt() ...")
+        prompts: typing.List[channel.channel.ConvenientSearchString] = [
+            "custom-prompt> ",
+            tbot.Re(r"c[a-z]{4}m-prompt> "),
+        ]
+        for prompt in prompts:
+            with lh.run(
+                "sh", "-c", "seq 1 100000; printf 'custom-prompt> '; read x"
+            ) as sh:
+                out = sh.read_until_prompt(prompt)
+                assert out.startswith("1\n2\n3\n"), repr(out[:20])
+                assert out.endswith("\n99999\n100000\n"), repr(out[-20:])
+                sh.sendline()
+                sh.terminate0()
+
+
+@tbot.testcase
+def selftest_machine_channel_readahead(
+    lab: typing.Optional[selftest.SelftestHost] = None,
+) -> None:
+    """Test that no data is lost between subsequent reads from a channel."""
+    with lab or selftest.SelftestHost() as lh:
+        with lh.run(
+            "sh", "-c", "seq 1 20000; echo Foo Bar Baz; printf 'P> '; read x"
+        ) as sh:
+            for i in range(1, 20001):
+                line = sh.readline()
+                assert line == f"{i}\n", repr(line)
+
+            res = sh.expect("Bar")
+            assert res.before == "Foo ", repr(res.before)
+
+            out = sh.read_until_prompt("P> ")
+            assert out == " Baz\n", repr(out)
+
+            sh.sendline()
+            sh.terminate0()
+
+
+@tbot.testcase
+def selftest_machine_channel_death_strings(
+    lab: typing.Optional[selftest.SelftestHost] = None,
+) -> None:
+    """Test death strings with lots of output and multiple active strings."""
+
+    class CustomException(channel.DeathStringException):
+        pass
+
+    with lab or selftest.SelftestHost() as lh:
+        with lh.run(
+            "sh", "-c", "seq 1 50000; echo FATAL-ERROR-42 -- panic; read x"
+        ) as sh:
+            previous = list(sh.death_strings)
+            try:
+                # Newer death strings take precedence
+                with sh.with_death_string("panic"), sh.with_death_string(
+                    "never-seen"
+                ), sh.with_death_string(tbot.Re(r"FATAL-ERROR-\d\d"), CustomException):
+                    sh.read_until_timeout(30)
+                raise AssertionError("death string was not detected")
+            except CustomException as e:
+                assert isinstance(e.match, bytes)
+                assert e.match == b"FATAL-ERROR-42", repr(e.match)
+
+            assert sh.death_strings == previous, repr(sh.death_strings)
+
+            sh.sendline()
+            sh.terminate0()
+
+
+@tbot.testcase
+def selftest_machine_channel_unicode(
+    lab: typing.Optional[selftest.SelftestHost] = None,
+) -> None:
+    """Test that characters split across chunks are logged correctly."""
+    with lab or selftest.SelftestHost() as lh:
+        expected = "ä€" * 3000 + "\n"
+        with lh.run(
+            "sh",
+            "-c",
+            "yes \"$(printf '\\303\\244\\342\\202\\254')\" | head -n 3000 | tr -d '\\n'; "
+            "echo; printf 'P> '; read x",
+        ) as sh:
+            with tbot.log.message(
+                "Unicode output", verbosity=tbot.log.Verbosity.CHANNEL
+            ) as ev, sh.with_stream(ev):
+                out = sh.read_until_prompt("P> ")
+                assert out.endswith(expected), repr(out[-20:])
+
+                log = ev.getvalue()
+                assert log.endswith(expected + "P> "), repr(log[-20:])
+                assert "\ufffd" not in log, "character was split"
+
+            sh.sendline()
+            sh.terminate0()
+
+
+@tbot.testcase
+def selftest_machine_channel_prompt_holdback(
+    lab: typing.Optional[selftest.SelftestHost] = None,
+) -> None:
+    """Test that output resembling the prompt is logged but the prompt is not."""
+    prompts: typing.List[channel.channel.ConvenientSearchString] = [
+        "P> ",
+        tbot.Re(r"P> "),
+    ]
+    for prompt in prompts:
+        with lab or selftest.SelftestHost() as lh:
+            with lh.run(
+                "sh", "-c", "printf 'P> P'; seq 1 5000; printf 'P>P> '; read x"
+            ) as sh:
+                with tbot.log.message(
+                    "Output", verbosity=tbot.log.Verbosity.CHANNEL
+                ) as ev:
+                    with sh.with_prompt(prompt), sh.with_stream(ev, show_prompt=False):
+                        out = sh.read_until_prompt()
+                    assert out.startswith("P> P1\n"), repr(out[:10])
+                    assert out.endswith("\n5000\nP>"), repr(out[-10:])
+                    assert ev.getvalue() == out, repr(ev.getvalue()[-10:])
+
+                sh.sendline()
+                sh.terminate0()
+
+    # A pattern prompt which matches less than its maximum length
+    with lab or selftest.SelftestHost() as lh:
+        with lh.run("sh", "-c", "seq 1 5000; printf 'P7> '; read x") as sh:
+            with tbot.log.message("Output", verbosity=tbot.log.Verbosity.CHANNEL) as ev:
+                with sh.with_prompt(tbot.Re(r"P[0-9]{1,3}> ")), sh.with_stream(
+                    ev, show_prompt=False
+                ):
+                    out = sh.read_until_prompt()
+                assert out.endswith("\n4999\n5000\n"), repr(out[-10:])
+                assert ev.getvalue() == out, repr(ev.getvalue()[-10:])
+
+            sh.sendline()
+            sh.terminate0()
+
+
+@tbot.testcase
+def selftest_machine_channel_iter_lines(
+    lab: typing.Optional[selftest.SelftestHost] = None,
+) -> None:
+    """Test iterating over channel output line by line."""
+    with lab or selftest.SelftestHost() as lh:
+        with lh.run("sh", "-c", "seq 1 20000; printf 'foo\\ntailP> '; read x") as sh:
+            for i, line in enumerate(sh.iter_lines(timeout=30), 1):
+                assert line == f"{i}\n", repr(line)
+                if i == 20000:
+                    break
+
+            with sh.with_prompt("P> "):
+                lines = list(sh.iter_lines(until_prompt=True))
+            assert lines == ["foo\n", "tail"], repr(lines)
+
+            sh.sendline()
+            sh.terminate0()
+
+
+@tbot.testcase
+def selftest_machine_channel_probing(
+    lab: typing.Optional[selftest.SelftestHost] = None,
+) -> None:
+    """Test waiting for a prompt while sending probes."""
+    with lab or selftest.SelftestHost() as lh:
+        # Answers immediately: only a single probe is necessary.
+        with lh.run("sh", "-c", "read x; echo RE''ADY; read x") as sh:
+            res = sh.read_until_prompt_probing(lambda: sh.sendline(), "READY\r\n")
+            assert res.probes == 1, repr(res)
+            assert res.rtt is not None and res.rtt <= res.duration, repr(res)
+            tbot.log.message(f"Prompt after {res.duration * 1000:.1f}ms")
+
+            sh.sendline()
+            sh.terminate0()
+
+        # Only answers after a while: retries must back off.
+        with lh.run("sh", "-c", "sleep 1; echo RE''ADY; read x") as sh:
+            res = sh.read_until_prompt_probing(
+                lambda: sh.send("."), "READY\r\n", interval=0.01, max_interval=10
+            )
+            assert res.duration >= 1, repr(res)
+            assert 2 <= res.probes <= 9, repr(res)
+
+            sh.sendline()
+            sh.terminate0()
+
+        with lh.run("sh", "-c", "read x") as sh:
+            start = time.monotonic()
+            raised = False
+            try:
+                sh.read_until_prompt_probing(lambda: None, "READY\r\n", timeout=0.3)
+            except TimeoutError:
+                raised = True
+            assert raised
+            assert time.monotonic() - start < 1
+
+            sh.sendline()
+            sh.terminate0()
+
+
+@tbot.testcase
+def selftest_machine_shell_init(
+    lab: typing.Optional[selftest.SelftestHost] = None,
+) -> None:
+    """Test and time shell initialization."""
+    with lab or selftest.SelftestHost() as lh:
+        rounds = 10
+        start = time.monotonic()
+        for _ in range(rounds):
+            with lh.subshell():
+                pass
+        duration = (time.monotonic() - start) / rounds
+        tbot.log.message(f"Shell initialization took {duration * 1000:.1f} ms")
+
+        with lh.subshell():
+            assert lh.env("HISTFILE") == ""
+            assert lh.env("PS2") == ""
+            assert lh.env("histchars") == ""
+            assert lh.exec0("echo", "\n^") == "\n^\n"
+            assert lh.test("false") is False
+
+
+@tbot.testcase
+def selftest_machine_map(
+    lab: typing.Optional[selftest.SelftestHost] = None,
+) -> None:
+    """Test running commands concurrently on clones."""
+    with lab or selftest.SelftestHost() as lh:
+        commands = [
+            ("sh", "-c", f"sleep 0.5; echo Command {i}; exit {i}") for i in range(8)
+        ]
+
+        start = time.monotonic()
+        results = lh.map(commands, workers=4)
+        duration = time.monotonic() - start
+        tbot.log.message(f"8 commands on 4 workers took {duration:.2f}s")
+
+        assert results == [(i, f"Command {i}\n") for i in range(8)], repr(results)
+        # Sequentially, this would take 4s
+        assert duration < 3, repr(duration)
+
+        # The original machine is not used and stays in a clean state
+        assert lh.exec0("echo", "Foo") == "Foo\n"
+
+        # Changes made by the clones are seen by the original machine
+        f = lh.workdir / "map-test-file"
+        lh.exec0("touch", f)
+        assert f.exists()
+        lh.map([("rm", "-f", f), ("true",)])
+        assert not f.exists(), "Stat cache is stale after map()"
+
+
+@tbot.testcase
+def selftest_machine_query_cache(
+    lab: typing.Optional[selftest.SelftestHost] = None,
+) -> None:
+    """Test caching of query results."""
+    with lab or selftest.SelftestHost() as lh:
+        calls = []
+
+        @linux.memoize
+        def query(m: linux.LinuxShell, arg: str) -> str:
+            calls.append(arg)
+            return m.exec0("pwd")
+
+        @linux.memoize_host
+        def host_query(m: linux.LinuxShell) -> str:
+            calls.append("host")
+            return m.exec0("uname")
+
+        # Disabled by default
+        query(lh, "a")
+        query(lh, "a")
+        assert calls == ["a", "a"], repr(calls)
+
+        lh.query_cache = True
+        try:
+            calls.clear()
+            assert query(lh, "a") == query(lh, "a")
+            query(lh, "b")
+            host_query(lh)
+            assert calls == ["a", "b", "host"], repr(calls)
+
+            # Changing the shell state drops cached results
+            lh.exec0("cd", "/")
+            assert query(lh, "a") == "/\n"
+            lh.env("TBOT_CACHE_TEST", "foo")
+            query(lh, "a")
+            with lh.subshell():
+                query(lh, "a")
+            query(lh, "a")
+            host_query(lh)
+            assert calls == ["a", "b", "host"] + ["a"] * 4, repr(calls)
+
+            # Environment variables are cached
+            assert lh.env("TBOT_CACHE_TEST") == "foo"
+            lh.exec0("export", "TBOT_CACHE_TEST=bar")
+            assert lh.env("TBOT_CACHE_TEST") == "bar"
+
+            lh.invalidate_cache()
+            host_query(lh)
+            assert calls[-1] == "host", repr(calls)
+        finally:
+            lh.query_cache = False
+            lh.invalidate_cache()
+            lh.exec0("cd", "-")
+
+
+@tbot.testcase
+def selftest_machine_facts(lab: typing.Optional[selftest.SelftestHost] = None) -> None:
+    """Test collecting host facts."""
+    with lab or selftest.SelftestHost() as lh:
+        # Tools which are not part of the facts don't need them
+        lh.invalidate_cache()
+        assert lh._has_tool("ls") and not lh._has_tool("tbot-nonexistent-tool")
+        assert lh._facts is None, "facts collected for a single tool"
+
+        facts = lh.facts
+        assert lh.facts is facts, "facts were collected twice"
+        assert lh._has_tool("ls")
+
+        for var in lh.facts_env:
+            assert facts.env[var] == lh.env(var), repr(facts.env)
+        assert lh.username == lh.env("USER")
+        assert facts.sysname == lh.exec0("uname", "-s").strip()
+        assert facts.release == lh.exec0("uname", "-r").strip()
+        assert facts.machine == lh.exec0("uname", "-m").strip()
+        assert facts.nproc == int(lh.exec0("nproc", "--all")), repr(facts.nproc)
+        assert facts.disk_free is not None and facts.disk_free > 0
+        for tool in lh.facts_tools:
+            assert facts.tools[tool] == lh.test("which", tool), repr(facts.tools)
+
+        # Changing the shell state drops the snapshot
+        with lh.subshell():
+            lh.env("USER", "tbot-facts\ntest")
+            assert lh.facts is not facts
+            assert lh.username == "tbot-facts\ntest"
+        assert lh.username == lh.env("USER")
+
+        # A home directory which does not exist must not stall collection
+        for home in ["/tbot-nonexistent/home", "", "relative/home"]:
+            with lh.subshell():
+                lh.env("HOME", home)
+                lh.exec0("unset", "XDG_DATA_HOME")
+                assert lh.facts.env["HOME"] == home
+                assert lh.facts.disk_free is not None and lh.facts.disk_free > 0
+
+        lh.facts_tools = ("tbot-nonexistent-tool",)
+        try:
+            lh.invalidate_cache()
+            assert lh.facts.tools == {"tbot-nonexistent-tool": False}
+        finally:
+            del lh.facts_tools
+            lh.invalidate_cache()
+
+
+def _check_exec_stream(m: linux.LinuxShell) -> None:
+    tbot.log.message("Testing mach.exec_stream() ...")
+
+    with m.exec_stream("seq", "1", "5000") as seq:
+        for i, line in enumerate(seq, 1):
+            assert line == f"{i}\n", repr(line)
+    assert i == 5000, repr(i)
+    assert seq.retcode == 0, repr(seq.retcode)
+
+    with m.exec_stream("sh", "-c", "printf 'a\\nb'; exit 3") as stream:
+        lines = list(stream)
+    assert lines == ["a\n", "b"], repr(lines)
+    assert stream.retcode == 3, repr(stream.retcode)
+
+    # Leaving early interrupts the command
+    with m.exec_stream("yes") as yes:
+        for line in yes:
+            assert line == "y\n", repr(line)
+            break
+    assert yes.retcode not in (None, 0), repr(yes.retcode)
+
+    m.exec0("true")
+
+
+def _check_exec_many(m: linux.LinuxShell) -> None:
+    tbot.log.message("Testing mach.exec_many() ...")
+
+    results = m.exec_many(
+        [("echo", "Foo"), ("sh", "-c", "printf Bar; exit 3"), ("true",)]
+    )
+    assert results == [(0, "Foo\n"), (3, "Bar"), (0, "")], repr(results)
+
+    results = m.exec_many(
+        [("true",), ("false",), ("echo", "Not run")], stop_on_error=True
+    )
+    assert results == [(0, ""), (1, "")], repr(results)
+
+    # More commands than fit into a single command-line
+    results = m.exec_many(("echo", f"Line {i}") for i in range(400))
+    assert len(results) == 400, repr(len(results))
+    for i, (retcode, output) in enumerate(results):
+        assert (retcode, output) == (0, f"Line {i}\n"), repr((retcode, output))
+
+    with m.batch(stop_on_error=True) as b:
+        foo = b.exec("echo", "Foo")
+        false = b.exec("false")
+        bar = b.exec("echo", "Bar")
+    assert (foo.retcode, foo.output) == (0, "Foo\n"), repr(foo.output)
+    assert false.retcode == 1, repr(false.retcode)
+    assert bar.retcode is None and bar.output is None, repr(bar.output)
+
+
+def _check_env_many(m: typing.Union[linux.LinuxShell, board.UBootShell]) -> None:
+    tbot.log.message("Testing mach.env_many() ...")
+
+    values = {f"TBOT_MANY_{i}": f"Value {i}" for i in range(100)}
+    if isinstance(m, linux.LinuxShell):
+        values["TBOT_MANY_SPECIAL"] = "-E 'foo'\nbar $baz"
+    out = m.env_many(values)
+    assert out == values, repr(out)
+
+    out = m.env_many(reversed(list(values)))
+    assert out == values, repr(out)
+    assert list(out) == list(reversed(list(values))), repr(list(out))
+
+    # Variables which are not set read as empty
+    names = ["TBOT_MANY_1", "TBOT_MANY_UNSET", "TBOT_MANY_2"]
+    out = m.env_many(names)
+    assert out == {names[0]: "Value 1", names[1]: "", names[2]: "Value 2"}, repr(out)
+    assert list(out) == names, repr(list(out))
+
+    assert m.env("TBOT_MANY_42") == "Value 42"
+
+
+def _check_spawn(m: linux.LinuxShell) -> None:
+    tbot.log.message("Testing mach.spawn() ...")
+
+    slow = m.spawn("sh", "-c", "sleep 2; echo Slow; exit 3")
+    fast = m.spawn("sh", "-c", "echo Fast >&2")
+    assert not slow.done()
+
+    assert fast.wait(timeout=10) == 0
+    assert fast.done() and fast.retcode == 0
+    assert fast.output() == "Fast\n", repr(fast.output())
+
+    raised = False
+    try:
+        slow.wait(timeout=0.2)
+    except TimeoutError:
+        raised = True
+    assert raised and slow.retcode is None
+
+    assert slow.wait() == 3
+    assert slow.output() == "Slow\n", repr(slow.output())
+
+    # Finished jobs must not leave notifications in the output of later commands
+    assert m.exec0("echo", "Foo") == "Foo\n"
+
+    # Files changed by a job are seen once it has ended
+    f = m.workdir / "spawn-test-file"
+    m.exec0("rm", "-f", f)
+    assert not f.exists()
+    toucher = m.spawn("touch", f)
+    assert toucher.wait(timeout=10) == 0
+    assert f.exists(), "Stat cache is stale after a job has ended"
+    m.exec0("rm", f)
+
+    sleeper = m.spawn("sleep", "60")
+    sleeper.kill()
+    assert sleeper.wait(timeout=10) == 143, repr(sleeper.retcode)
+    sleeper.kill()
+
+    # Killing a command which just ended, but whose return code was not read
+    # yet, must not fail.
+    quick = m.spawn("true")
+    m.exec0("sleep", "0.5")
+    quick.kill()
+    assert quick.retcode == 0 or quick.wait(timeout=10) == 0
+
+    raised = False
+    try:
+        linux.Job(m, m.workdir / "tbot-job-nonexistent").kill()
+    except Exception as e:
+        raised = "never started" in str(e)
+    assert raised, "killing a job without a pid did not fail properly"
+
+    for job in [fast, slow, sleeper, quick]:
+        job.cleanup()
+        assert not job._out.exists() and not job._pid.exists()
+
+
+def _check_exec_spooled(m: typing.Union[linux.LinuxShell, board.UBootShell]) -> None:
+    retcode, out = m.exec_spooled("echo", "Hello World")
+    with out:
+        assert retcode == 0, repr(retcode)
+        assert not out.spooled, repr(out)
+        assert str(out) == "Hello World\n", repr(str(out))
+
+    m.spool_threshold = 500
+    try:
+        s = "_".join(f"{i:03}" for i in range(200))
+        retcode, out = m.exec_spooled("echo", s)
+    finally:
+        del m.spool_threshold
+
+    with out:
+        assert retcode == 0, repr(retcode)
+        assert out.spooled, repr(out)
+        assert out.size == len(s) + 1, repr(out)
+        assert str(out) == f"{s}\n", repr(out.tail(20))
+        assert list(out) == [f"{s}\n"], repr(out.tail(20))
+
+        excerpt = out.excerpt(100)
+        assert excerpt.startswith("000_001_"), repr(excerpt)
+        assert excerpt.endswith("_198_199\n"), repr(excerpt)
+        assert f"[... {len(s) + 1 - 100} bytes omitted ...]" in excerpt, repr(excerpt)
+
+
+def _check_forbidden_bytes(m: typing.Union[linux.LinuxShell, board.UBootShell]) -> None:
+    try:
+        m.exec0("echo", "foo\x03bar")
+        raise AssertionError("forbidden byte was sent")
+    except Exception as e:
+        assert "forbidden byte" in str(e), repr(e)
+    out = m.exec0("echo", "still alive")
+    assert out == "still alive\n", repr(out)
+
+
 @tbot.testcase
 def selftest_machine_shell(m: typing.Union[linux.LinuxShell, board.UBootShell]) -> None:
     # Capabilities
@@ -136,13 +685,28 @@ def selftest_machine_shell(m: typing.Union[linux.LinuxShell, board.UBootShell])
     assert m.test("true")
     assert not m.test("false")
 
+    tbot.log.message("Testing forbidden bytes ...")
+    _check_forbidden_bytes(m)
+
+    tbot.log.message("Testing spooled output ...")
+    _check_exec_spooled(m)
+
     if isinstance(m, linux.LinuxShell):
+        retcode, out = m.exec("sh", "-c", "echo Foo; exit 123")
+        assert retcode == 123, repr(retcode)
+        assert out == "Foo\n", repr(out)
+
+        _check_exec_many(m)
+        _check_spawn(m)
+
         tbot.log.message("Testing env vars ...")
         value = "12\nfoo !? # true; exit\n"
         m.env("TBOT_TEST_ENV_VAR", value)
         out = m.env("TBOT_TEST_ENV_VAR")
         assert out == value, repr(out)
 
+        _check_env_many(m)
+
         tbot.log.message("Testing redirection (and weird paths) ...")
         f = m.workdir / ".redir test.txt"
         if f.exists():
@@ -322,6 +886,8 @@ def selftest_machine_shell(m: typing.Union[linux.LinuxShell, board.UBootShell])
 
             m.exec0("true")
 
+            _check_exec_stream(m)
+
     if isinstance(m, board.UBootShell):
         tbot.log.message("Testing env vars ...")
 
@@ -332,6 +898,12 @@ def selftest_machine_shell(m: typing.Union[linux.LinuxShell, board.UBootShell])
         out = m.env("TBOT_TEST")
         assert out == "Lorem ipsum dolor sit amet", repr(out)
 
+        _check_env_many(m)
+
+        env = m.env_dump()
+        assert env["TBOT_TEST"] == "Lorem ipsum dolor sit amet", repr(env)
+        assert env["TBOT_MANY_7"] == "Value 7", repr(env)
+
 
 @tbot.testcase
 def selftest_machine_channel(lab: typing.Optional[linux.Lab] = None,) -> None:
@@ -352,6 +924,18 @@ def selftest_machine_channel(lab: typing.Optional[linux.Lab] = None,) -> None:
         out = ch.read()
         assert out == b"ABCDEFGHIJKLMNOPQRSTUVWXYZ", repr(out)
 
+    # Writing to a process which does not read must fail once it has exited
+    # instead of blocking forever.
+    ch = channel.SubprocessChannel()
+    ch.sendline("stty raw -echo; exec sleep 1")
+    time.sleep(0.3)
+    raised = False
+    try:
+        ch.send(b"x\n" * 5000000)
+    except channel.ChannelClosedException:
+        raised = True
+    assert raised, "Writing to an exited process did not fail"
+
     with channel.SubprocessChannel() as ch:
         ch.read()
         # Test read iter
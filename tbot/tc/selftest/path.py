@@ -14,6 +14,9 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import hashlib
+import pathlib
+import tempfile
 import typing
 import stat
 import tbot
@@ -21,7 +24,12 @@ import tbot.error
 from tbot.machine import linux
 from tbot.tc import selftest
 
-__all__ = ["selftest_path_integrity", "selftest_path_stat", "selftest_path_files"]
+__all__ = [
+    "selftest_path_integrity",
+    "selftest_path_stat",
+    "selftest_path_files",
+    "selftest_path_listing",
+]
 
 
 @tbot.testcase
@@ -60,7 +68,7 @@ def selftest_path_stat(lab: typing.Optional[selftest.SelftestHost] = None) -> No
     with lab or selftest.SelftestHost() as lh:
         tbot.log.message("Setting up test files ...")
         symlink = lh.workdir / "symlink"
-        if symlink.exists():
+        if symlink.is_symlink():
             lh.exec0("rm", symlink)
         lh.exec0("ln", "-s", "/proc/version", symlink)
 
@@ -128,6 +136,28 @@ def selftest_path_stat(lab: typing.Optional[selftest.SelftestHost] = None) -> No
         for p, check in stat_list:
             assert check(p.stat().st_mode)
 
+        tbot.log.message("Checking batched stat ...")
+        results = linux.stat_many([p for p, _ in stat_list] + [nonexistent])
+        assert results[-1] is None
+        for (p, check), st in zip(stat_list, results):
+            assert st is not None and check(st.st_mode), f"Wrong result for {p}"
+            assert st == p.stat()
+
+        assert symlink.is_symlink() and symlink.is_file() and symlink.exists()
+        lh.exec0("ln", "-sf", "nonexistent", symlink)
+        assert symlink.is_symlink() and not symlink.exists()
+        lh.exec0("ln", "-sf", "/proc/version", symlink)
+
+        tbot.log.message("Checking stat cache invalidation ...")
+        assert not nonexistent.exists()
+        lh.exec0("touch", nonexistent)
+        assert nonexistent.is_file()
+        lh.exec0("rm", nonexistent)
+        assert not nonexistent.exists()
+        lh.exec0(linux.Raw(f"mkdir {lh.escape(nonexistent)}"))
+        assert nonexistent.is_dir()
+        lh.exec0("rmdir", nonexistent)
+
 
 @tbot.testcase
 def selftest_path_files(lab: typing.Optional[selftest.SelftestHost] = None) -> None:
@@ -154,6 +184,61 @@ def selftest_path_files(lab: typing.Optional[selftest.SelftestHost] = None) -> N
             output_bin == content_bin
         ), f"Sending {content_bin!r} resulted in {output_bin!r}"
 
+        tbot.log.message("Testing large uploads ...")
+        content_bin = bytes(range(256)) * 1000 + b"\r\n\x03\x04"
+        assert f.write_bytes(content_bin) == len(content_bin)
+        assert f.read_bytes() == content_bin, "Large upload was corrupted"
+
+        assert (
+            f.write_bytes(memoryview(content_bin)[1:], compress=True)
+            == len(content_bin) - 1
+        )
+        assert f.read_bytes() == content_bin[1:], "Compressed upload was corrupted"
+
+        with tempfile.NamedTemporaryFile() as local:
+            local.write(content_bin)
+            local.flush()
+            f.write_bytes(pathlib.Path(local.name))
+        assert f.read_bytes() == content_bin, "Upload of local file was corrupted"
+
+        tbot.log.message("Testing streaming and ranged downloads ...")
+        f.write_bytes(content_bin)
+        assert f.read_bytes(compress=True) == content_bin, "Compressed download"
+        chunks = list(f.iter_bytes(chunk_size=10000))
+        assert [len(c) for c in chunks[:-1]] == [10000] * 25, "Wrong chunk sizes"
+        assert b"".join(chunks) == content_bin, "Streamed download was corrupted"
+
+        for chunk in f.iter_bytes(chunk_size=1024):
+            break
+        assert chunk == content_bin[:1024]
+        assert lh.exec0("echo", "still usable") == "still usable\n"
+
+        assert f.read_range(1000, 300) == content_bin[1000:1300]
+        assert f.read_range(len(content_bin) - 3) == content_bin[-3:]
+        assert f.read_range(len(content_bin) + 5, 10) == b""
+        assert f.read_range(0, 2, compress=True) == content_bin[:2]
+
+        tbot.log.message("Testing synced uploads ...")
+        assert f.sha256() == hashlib.sha256(content_bin).hexdigest()
+        assert f.is_file()
+        assert f.sha256() == hashlib.sha256(content_bin).hexdigest()
+        assert f._local_str() in (lh._stats or {}), "Hashing dropped stat cache"
+
+        # Without `stat`, the file is simply hashed each time
+        lh._has_stat = False
+        assert f.sha256() == hashlib.sha256(content_bin).hexdigest()
+        lh.invalidate_cache()
+        lh.exec0("touch", "-d", "@0", f)
+        assert f.write_bytes(content_bin, sync=True) == len(content_bin)
+        assert lh.exec0("stat", "-c", "%Y", f) == "0\n", "Synced file was rewritten"
+        assert f.write_bytes(content_bin[:-1], sync=True) == len(content_bin) - 1
+        assert f.read_bytes() == content_bin[:-1], "Changed file was not synced"
+        assert f.sha256() == hashlib.sha256(content_bin[:-1]).hexdigest()
+
+        f.write_text("Line endings\r\nstay\n")
+        output_bin = f.read_bytes()
+        assert output_bin == b"Line endings\r\nstay\n", repr(output_bin)
+
         tbot.log.message("Test reading/writing invalid file ...")
         f = lh.workdir / "path-test.50278c53-3cfc-4983-9770-d571b29b3955"
 
@@ -191,3 +276,65 @@ def selftest_path_files(lab: typing.Optional[selftest.SelftestHost] = None) -> N
             raised = True
 
         assert raised, "Reading invalid file supposedly succeeded (binary mode)"
+
+
+@tbot.testcase
+def selftest_path_listing(lab: typing.Optional[selftest.SelftestHost] = None) -> None:
+    """Test listing directories via the Path class"""
+
+    with lab or selftest.SelftestHost() as lh:
+        d = lh.workdir / "path-listing"
+        lh.exec0("rm", "-rf", d)
+        lh.exec0("mkdir", "-p", d / "a" / "b", d / "c")
+        lh.exec0("touch", d / "x.c", d / "a" / "y.c", d / "a" / "b" / "z.h")
+        lh.exec0("touch", d / "c" / "with space.c", d / "c" / "new\nline.c")
+        lh.exec0("ln", "-s", "a", d / "link")
+
+        tbot.log.message("Testing iterdir() ...")
+        entries = {p.name: p for p in d.iterdir()}
+        assert sorted(entries) == ["a", "c", "link", "x.c"], repr(entries)
+        assert entries["a"].is_dir() and entries["x.c"].is_file()
+        assert entries["link"].is_symlink() and entries["link"].is_dir()
+        assert sorted(p.name for p in (d / "link").iterdir()) == ["b", "y.c"]
+
+        for p in d.iterdir():
+            break
+        assert lh.exec0("echo", "still usable") == "still usable\n"
+
+        raised = False
+        try:
+            list((d / "nonexistent").iterdir())
+        except OSError:
+            raised = True
+        assert raised, "Listing a nonexistent directory succeeded"
+
+        tbot.log.message("Testing rglob() ...")
+        found = set(d.rglob("*.c"))
+        assert found == {
+            d / "a" / "y.c",
+            d / "c" / "new\nline.c",
+            d / "c" / "with space.c",
+            d / "x.c",
+        }, repr(found)
+        assert list(d.rglob("*.nonexistent")) == []
+
+        raised = False
+        try:
+            d.rglob("a/*.c")
+        except ValueError:
+            raised = True
+        assert raised, "rglob() accepted a pattern containing a `/`"
+
+        tbot.log.message("Testing walk() ...")
+        tree = {
+            dirpath: (sorted(dirnames), sorted(filenames))
+            for dirpath, dirnames, filenames in d.walk()
+        }
+        assert tree == {
+            d: (["a", "c"], ["link", "x.c"]),
+            d / "a": (["b"], ["y.c"]),
+            d / "a" / "b": ([], ["z.h"]),
+            d / "c": ([], ["new\nline.c", "with space.c"]),
+        }, repr(tree)
+
+        lh.exec0("rm", "-rf", d)
@@ -21,6 +21,7 @@ def selftest_tc(lab: typing.Optional[selftest.SelftestHost] = None) -> None:
             selftest_tc_git_bisect,  # noqa: F405
             selftest_tc_shell_copy,  # noqa: F405
             selftest_tc_build_toolchain,  # noqa: F405
+            selftest_tc_build_toolchain_snapshot,  # noqa: F405
             selftest_tc_uboot_checkout,  # noqa: F405
             selftest_tc_uboot_build,  # noqa: F405
             selftest_tc_uboot_patched_bisect,  # noqa: F405
@@ -19,7 +19,7 @@ import tbot
 from tbot.machine import linux, connector
 from tbot.tc import selftest
 
-__all__ = ("selftest_tc_build_toolchain",)
+__all__ = ("selftest_tc_build_toolchain", "selftest_tc_build_toolchain_snapshot")
 
 
 class LocalDummyBuildhost(connector.SubprocessConnector, linux.Bash, linux.Builder):
@@ -62,3 +62,60 @@ def selftest_tc_build_toolchain(
 
         cc = bh.env("CC")
         assert cc != "dummy-none-gcc", repr(cc)
+
+
+@tbot.testcase
+def selftest_tc_build_toolchain_snapshot(
+    lab: typing.Optional[selftest.SelftestHost] = None,
+) -> None:
+    """Test replaying the environment of an env script toolchain."""
+    with LocalDummyBuildhost() as bh:
+        script = bh.workdir / ".selftest-toolchain.sh"
+        script.write_text("""\
+export CC=dummy-none-gcc
+export TBOT_TOOLCHAIN_VALUE='some "quoted"
+value'
+unset TBOT_TOOLCHAIN_UNSET
+TBOT_TOOLCHAIN_LOCAL=local
+""")
+        bh.env("TBOT_TOOLCHAIN_UNSET", "set")
+        linux.build._SNAPSHOTS.clear()
+
+        def check(cc: str) -> None:
+            with bh.enable("selftest-toolchain"):
+                values = bh.env_many(
+                    ["CC", "TBOT_TOOLCHAIN_VALUE", "TBOT_TOOLCHAIN_UNSET"]
+                )
+            assert values == {
+                "CC": cc,
+                "TBOT_TOOLCHAIN_VALUE": 'some "quoted"\nvalue',
+                "TBOT_TOOLCHAIN_UNSET": "",
+            }, repr(values)
+            assert bh.env("TBOT_TOOLCHAIN_UNSET") == "set"
+
+        tbot.log.message("Recording snapshot ...")
+        check("dummy-none-gcc")
+        assert len(linux.build._SNAPSHOTS) == 1, repr(linux.build._SNAPSHOTS)
+
+        tbot.log.message("Replaying snapshot ...")
+        check("dummy-none-gcc")
+        assert len(linux.build._SNAPSHOTS) == 1, repr(linux.build._SNAPSHOTS)
+
+        tbot.log.message("Changing the env script ...")
+        bh.exec0("sed", "-i", "s/dummy-none/dummy-other/", script)
+        check("dummy-other-gcc")
+        assert len(linux.build._SNAPSHOTS) == 2, repr(linux.build._SNAPSHOTS)
+
+        tbot.log.message("Storing snapshot on the host ...")
+        bh.toolchain_cache = True
+        linux.build._SNAPSHOTS.clear()
+        check("dummy-other-gcc")
+        cache_files = list(bh.workdir.glob(".tbot-toolchain-*.sh"))
+        assert cache_files != [], "No snapshot was stored"
+
+        linux.build._SNAPSHOTS.clear()
+        check("dummy-other-gcc")
+        assert linux.build._SNAPSHOTS == {}, repr(linux.build._SNAPSHOTS)
+
+        for f in cache_files:
+            bh.exec0("rm", f)
@@ -45,6 +45,17 @@ def selftest_tc_shell_copy(lab: typing.Optional[selftest.SelftestHost] = None) -
             "Copy locally",
         )
 
+        tbot.log.message("Test syncing a file on the same host ...")
+        a = lh.workdir / ".selftest-copy-local1"
+        b = lh.workdir / ".selftest-copy-local2"
+        lh.exec0("touch", "-d", "@0", b)
+        shell.copy(a, b, sync=True)
+        assert lh.exec0("stat", "-c", "%Y", b) == "0\n", "Synced file was copied"
+
+        a.write_text("Changed\n")
+        shell.copy(a, b, sync=True)
+        assert b.read_text() == "Changed\n", "Changed file was not synced"
+
         if minisshd.check_minisshd(lh):
             with minisshd.minisshd(lh) as ssh:
                 tbot.log.message("Test downloading a file from an ssh host ...")
@@ -78,8 +78,24 @@ def _scp_copy(
         )
 
 
+def _is_synced(p1: linux.Path[H1], p2: linux.Path[H2]) -> bool:
+    for p in (p1, p2):
+        if not p.host._has_tool("sha256sum"):
+            return False
+
+    try:
+        size, digest = p1._digest()
+        if p2._digest()[1] != digest:
+            return False
+    except OSError:
+        return False
+
+    tbot.log.message(f"{p2} is up to date, saved transferring {size} bytes.")
+    return True
+
+
 @tbot.testcase
-def copy(p1: linux.Path[H1], p2: linux.Path[H2]) -> None:
+def copy(p1: linux.Path[H1], p2: linux.Path[H2], sync: bool = False) -> None:
     """
     Copy a file, possibly from one host to another.
 
@@ -102,7 +118,15 @@ def copy(p1: linux.Path[H1], p2: linux.Path[H2]) -> None:
 
     :param linux.Path p1: Exisiting path to be copied
     :param linux.Path p2: Target where ``p1`` should be copied
+    :param bool sync: Skip the copy if ``p2`` already has the same content as
+        ``p1``.  The digests of both files are compared using
+        :py:meth:`Path.sha256() <tbot.machine.linux.Path.sha256>`, which needs
+        ``sha256sum`` on both hosts.  Without it, the file is always copied.
     """
+    if sync and _is_synced(p1, p2):
+        return
+    p2._forget_digest()
+
     if isinstance(p1.host, p2.host.__class__) or isinstance(p2.host, p1.host.__class__):
         # Both paths are on the same host
         p2_w1 = linux.Path(p1.host, p2)
@@ -177,6 +201,9 @@ def check_for_tool(host: linux.LinuxShell, tool: str) -> bool:
     """
     Check whether a certain tool/program is installed on a host.
 
+    Tools listed in :py:attr:`~tbot.machine.linux.LinuxShell.facts_tools` are
+    looked up in the host's :py:attr:`~tbot.machine.linux.LinuxShell.facts`,
+    all others are checked with ``which``.
     Results from previous invocations are cached.
 
     **Example**:
@@ -200,7 +227,7 @@ def check_for_tool(host: linux.LinuxShell, tool: str) -> bool:
 
     if tool not in _TOOL_CACHE[host]:
         with tbot.testcase("check_for_tool"):
-            has_tool = host.test("which", tool)
+            has_tool = host._has_tool(tool)
             _TOOL_CACHE[host][tool] = has_tool
 
             if has_tool:
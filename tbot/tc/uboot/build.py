@@ -169,7 +169,9 @@ class UBootBuilder(abc.ABC):
 
         By default, this steps runs ``make -j $(nproc)``.
         """
-        nproc = int(bh.exec0("nproc", "--all"))
+        nproc = bh.facts.nproc
+        if nproc is None:
+            nproc = int(bh.exec0("nproc", "--all"))
         bh.exec0("make", "-j", str(nproc), "all")
 
     # --------------------------------------------------------------------------- #
@@ -249,8 +249,11 @@ The build() method for the selected lab should not return `self` but instead `se
 
         # test/py wants to read U-Boot's config.  Run the builder's configure
         # step if no `.config` is available and then also generate `autoconf.mk`.
-        dotconfig_missing = not (uboot_repo / ".config").exists()
-        autoconfmk_missing = not (uboot_repo / "include" / "autoconf.mk").exists()
+        dotconfig = uboot_repo / ".config"
+        autoconfmk = uboot_repo / "include" / "autoconf.mk"
+        linux.stat_many([dotconfig, autoconfmk])
+        dotconfig_missing = not dotconfig.exists()
+        autoconfmk_missing = not autoconfmk.exists()
 
         if dotconfig_missing or autoconfmk_missing:
             with tbot.testcase("uboot_configure"), builder.do_toolchain(bh):
@@ -27,7 +27,7 @@ class PyserialChannelIO(channel.ChannelIO):
         self.serial = serial.Serial(os.fspath(port), baudrate=baudrate, exclusive=True)
         self.serial.timeout = 0
 
-    def write(self, buf: bytes) -> int:
+    def write(self, buf: typing.Union[bytes, memoryview]) -> int:
         if self.closed:
             raise channel.ChannelClosedException()
 
@@ -58,6 +58,27 @@ class PyserialChannelIO(channel.ChannelIO):
 
         return channel.channel._debug_log(self, first + remaining, False)
 
+    def readinto(self, buf: memoryview, timeout: typing.Optional[float] = None) -> int:
+        if self.closed:
+            raise channel.ChannelClosedException()
+
+        try:
+            # Block for the first byte only
+            self.serial.timeout = timeout
+            n = self.serial.readinto(buf[:1])
+
+            if n == 0:
+                raise TimeoutError()
+        finally:
+            self.serial.timeout = 0
+
+        if len(buf) > 1:
+            # If there is more, read it now (non-blocking)
+            n += self.serial.readinto(buf[1 : min(len(buf), READ_CHUNK_SIZE)])
+
+        channel.channel._debug_log(self, buf[:n], False)
+        return n
+
     def close(self) -> None:
         if self.closed:
             raise channel.ChannelClosedException()